@@ -0,0 +1,405 @@
+"""Headless benchmark for the conversion pipeline.
+
+Generates synthetic animated WebPs (cached between runs) and times each
+pipeline stage in its own subprocess, so peak RSS is per stage:
+
+    python benchmarks/bench_converter.py                 # default matrix
+    python benchmarks/bench_converter.py --preset quick  # smoke run
+    python benchmarks/bench_converter.py --sizes 3840x2160 --frames 48 \
+        --stages decode,resize,stream-mp4 -o bench_4k.json
+
+Results go to a JSON file: one entry per (fixture, stage) with seconds,
+frames/sec, MB/s of decoded RGBA data and peak RSS of the Python process and
+of its ffmpeg children. Compare files from two releases to spot regressions.
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import struct
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image, ImageDraw, ImageSequence  # noqa: E402
+import webp_converter_engine as engine  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = (
+    "meta", "decode", "resize", "letterbox", "write",
+    "encode-mp4", "encode-mkv", "encode-webm", "encode-gif",
+    "stream-mp4", "stream-gif", "combine",
+)
+
+# (width, height, frames, alpha, variable durations)
+PRESETS = {
+    "quick": [
+        (320, 240, 24, True, True),
+        (1280, 720, 48, False, False),
+    ],
+    "default": [
+        (320, 240, 24, True, True),
+        (320, 240, 96, False, False),
+        (1280, 720, 24, False, True),
+        (1280, 720, 96, True, False),
+        (1920, 1080, 24, True, True),
+        (1920, 1080, 96, False, False),
+    ],
+}
+PRESETS["full"] = PRESETS["default"] + [
+    (3840, 2160, 48, True, True),
+    (engine.MAX_DIMENSION, 4320, 12, False, False),
+]
+
+VARIABLE_DURATIONS = (40, 80, 40, 120, 60)
+FINAL_HOLD_MS = 1000          # every fixture ends on a long frame, like a title card
+END_CARD_FRAMES = 4           # ...held as this many identical frames (dedupe merges them)
+DURATION_TOLERANCE_S = 0.02   # streamed outputs must keep the source's length
+
+
+# ── Fixtures ─────────────────────────────────
+
+def fixture_name(w, h, frames, alpha, variable) -> str:
+    return (f"{w}x{h}_{frames}f_{'alpha' if alpha else 'opaque'}"
+            f"_{'vfr' if variable else 'cfr'}_card.webp")
+
+
+def make_fixture(path: Path, w, h, frames, alpha, variable):
+    """Moving shapes over a gradient; transparent background when alpha."""
+    base = Image.linear_gradient("L").resize((w, h))
+    bg = Image.merge("RGBA", (base, base.transpose(Image.Transpose.FLIP_LEFT_RIGHT),
+                              Image.new("L", (w, h), 96),
+                              Image.new("L", (w, h), 0 if alpha else 255)))
+    images = []
+    box = max(8, min(w, h) // 4)
+    for i in range(frames):
+        im = bg.copy()
+        draw = ImageDraw.Draw(im)
+        x = (i * max(1, w // frames)) % max(1, w - box)
+        y = (h - box) // 2
+        draw.ellipse([x, y, x + box, y + box], fill=(255, (i * 17) % 256, 40, 255))
+        draw.rectangle([w - x - box // 2, 0, w - x, h // 3], fill=(20, 200, 255, 200))
+        images.append(im)
+    durations = ([VARIABLE_DURATIONS[i % len(VARIABLE_DURATIONS)] for i in range(frames)]
+                 if variable else [40] * frames)
+    card_ms = FINAL_HOLD_MS // END_CARD_FRAMES
+    durations[-1] = card_ms
+    tmp = path.with_suffix(".tmp")
+    images[0].save(tmp, format="WEBP", save_all=True, append_images=images[1:],
+                   duration=durations, loop=0, quality=80, method=0)
+    append_still_frames(tmp, END_CARD_FRAMES - 1, card_ms)
+    os.replace(tmp, path)
+
+
+def append_still_frames(path: Path, count: int, ms: int):
+    """Append frames that decode identical to the last one: a blended 1x1
+    transparent pixel. Pillow's encoder folds real repeats into the previous
+    frame's duration, so this is how a held end card gets into a fixture."""
+    buf = io.BytesIO()
+    Image.new("RGBA", (1, 1)).save(buf, format="WEBP", lossless=True)
+    still = buf.getvalue()[12:]          # the VP8L chunk of a still image
+    frame = (b"\0" * 12 + ms.to_bytes(3, "little") + b"\0") + still
+    anmf = b"ANMF" + struct.pack("<I", len(frame)) + frame
+    with open(path, "r+b") as f:
+        f.seek(0, os.SEEK_END)
+        f.write(anmf * count)
+        size = f.tell() - 8
+        f.seek(4)
+        f.write(struct.pack("<I", size))
+
+
+def ensure_fixtures(folder: Path, specs) -> list:
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for spec in specs:
+        path = folder / fixture_name(*spec)
+        if not path.exists():
+            print(f"  generating {path.name}", file=sys.stderr)
+            make_fixture(path, *spec)
+        paths.append(str(path))
+    return paths
+
+
+# ── Stage runners (executed in a child process) ──
+
+def _settings(**overrides) -> dict:
+    # no output cache: a hit would time a file copy, and it is the user's cache
+    s = engine.normalize_settings({"stream": False, "cache": False})
+    s.update(overrides)
+    return s
+
+
+def _frame_count(path: str) -> tuple:
+    with Image.open(path) as im:
+        return getattr(im, "n_frames", 1), im.width, im.height
+
+
+def _decoded_frames(path: str):
+    with Image.open(path) as im:
+        for frame in ImageSequence.Iterator(im):
+            yield frame.convert("RGBA")
+
+
+def _source_seconds(paths: list) -> float:
+    return sum(sum(engine.parse_webp(p)["durations"]) for p in paths) / 1000
+
+
+def _output_seconds(path: str) -> float:
+    """Length of an output as a player reports it (container duration)."""
+    if path.endswith(".gif"):
+        with Image.open(path) as im:
+            return sum(frame.info.get("duration", 0)
+                       for frame in ImageSequence.Iterator(im)) / 1000
+    proc = subprocess.run([engine.ffmpeg_exe(), "-hide_banner", "-i", path],
+                          capture_output=True, text=True)
+    h, m, s = re.search(r"Duration: (\d+):(\d+):([\d.]+)", proc.stderr).groups()
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+
+def check_duration(paths: list, output: str):
+    """Raise if a streamed output is not as long as its sources, e.g. the
+    final frame's hold went missing."""
+    want, got = _source_seconds(paths), _output_seconds(output)
+    if abs(got - want) > DURATION_TOLERANCE_S:
+        raise RuntimeError(f"{Path(output).name} lasts {got:.3f}s, "
+                           f"source {want:.3f}s")
+
+
+def run_stage(stage: str, paths: list, work: Path) -> dict:
+    """Run one stage on the fixture(s); returns frames and pixels processed."""
+    src = paths[0]
+    n, w, h = _frame_count(src)
+    frames, pixels = n, n * w * h
+    converter = engine.Converter()
+    elapsed = 0.0
+
+    if stage == "meta":
+        t = time.perf_counter()
+        engine.read_meta(src)
+        elapsed = time.perf_counter() - t
+
+    elif stage == "decode":
+        t = time.perf_counter()
+        for _ in _decoded_frames(src):
+            pass
+        elapsed = time.perf_counter() - t
+
+    elif stage in ("resize", "letterbox"):
+        settings = _settings(resolution="480p")
+        target = converter.target_size(w, h, settings)
+        plan = None
+        if stage == "letterbox":
+            target = engine.RESOLUTION_MAP["480p"]
+            plan = engine.LetterboxPlan((w, h), target)
+        for img in _decoded_frames(src):
+            t = time.perf_counter()
+            converter._fit(img, target, plan)
+            elapsed += time.perf_counter() - t
+
+    elif stage == "write":
+        for i, img in enumerate(_decoded_frames(src)):
+            t = time.perf_counter()
+            img.save(work / f"frame_{i:06d}.png")
+            elapsed += time.perf_counter() - t
+
+    elif stage.startswith("encode-"):
+        fmt = "." + stage.split("-", 1)[1]
+        settings = _settings(format=fmt)
+        staged = converter.extract_frames(src, work, settings)
+        t = time.perf_counter()
+        converter.encode(staged, str(work / f"out{fmt}"), settings)
+        elapsed = time.perf_counter() - t
+
+    elif stage.startswith("stream-"):
+        fmt = "." + stage.split("-", 1)[1]
+        settings = _settings(format=fmt, stream=True)
+        t = time.perf_counter()
+        converter.convert_file(src, str(work / f"out{fmt}"), work, settings)
+        elapsed = time.perf_counter() - t
+        check_duration([src], str(work / f"out{fmt}"))
+
+    elif stage == "combine":
+        settings = _settings(format=".mp4", combine=True, stream=True,
+                             output_folder=str(work), files=list(paths))
+        frames = pixels = 0
+        for p in paths:
+            pn, pw, ph = _frame_count(p)
+            frames += pn
+            pixels += pn * pw * ph
+        t = time.perf_counter()
+        result = engine.ConversionEngine().run(settings)
+        elapsed = time.perf_counter() - t
+        if result["failures"]:
+            raise RuntimeError(result["failures"][0][1])
+        check_duration(paths, result["outputs"][0])
+
+    else:
+        raise ValueError(f"unknown stage {stage!r}")
+
+    return {"seconds": elapsed, "frames": frames, "pixels": pixels}
+
+
+def _reset_peak_rss():
+    """Restart this process's high-water mark at its current RSS (Linux).
+
+    Linux carries ru_maxrss across exec, so without this a stage child
+    reports the driver's peak, and ffmpeg (which inherits its parent's mark
+    the same way) the child's peak before the stage began."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _vm_hwm_mb() -> float | None:
+    """Peak RSS since the last _reset_peak_rss(), from /proc (Linux)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def _peak_rss_mb(who) -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _child_main(stage: str, paths: list) -> int:
+    _reset_peak_rss()
+    with tempfile.TemporaryDirectory() as tmp:
+        out = run_stage(stage, paths, Path(tmp))
+    out["peak_rss_mb"] = _vm_hwm_mb() or _peak_rss_mb(
+        resource.RUSAGE_SELF if resource else None)
+    out["ffmpeg_peak_rss_mb"] = _peak_rss_mb(resource.RUSAGE_CHILDREN if resource else None)
+    print(json.dumps(out))
+    return 0
+
+
+# ── Driver ───────────────────────────────────
+
+def run_case(stage: str, paths: list, timeout: float) -> dict:
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", stage, *paths]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"error": f"timed out after {timeout:.0f}s"}
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1:] or ["failed"]}
+    data = json.loads(proc.stdout.strip().splitlines()[-1])
+    secs = data["seconds"]
+    data["fps"] = round(data["frames"] / secs, 2) if secs > 0 else None
+    data["mb_per_s"] = round(data["pixels"] * 4 / 1e6 / secs, 2) if secs > 0 else None
+    data["seconds"] = round(secs, 4)
+    return data
+
+
+def _parse_sizes(text: str) -> list:
+    sizes = []
+    for part in text.split(","):
+        w, _, h = part.strip().lower().partition("x")
+        sizes.append((int(w), int(h)))
+    return sizes
+
+
+def build_specs(args) -> list:
+    if not (args.sizes or args.frames):
+        return PRESETS[args.preset]
+    sizes = _parse_sizes(args.sizes) if args.sizes else [(1280, 720)]
+    counts = [int(n) for n in args.frames.split(",")] if args.frames else [48]
+    specs = []
+    for i, (w, h) in enumerate(sizes):
+        if max(w, h) > engine.MAX_DIMENSION:
+            raise SystemExit(f"{w}x{h} exceeds MAX_DIMENSION ({engine.MAX_DIMENSION})")
+        for j, n in enumerate(counts):
+            specs.append((w, h, n, (i + j) % 2 == 0, (i + j) % 2 == 1))
+    return specs
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--preset", choices=sorted(PRESETS), default="default")
+    p.add_argument("--sizes", help="comma-separated WxH list (overrides preset)")
+    p.add_argument("--frames", help="comma-separated frame counts (overrides preset)")
+    p.add_argument("--stages", default=",".join(STAGES),
+                   help=f"comma-separated subset of: {', '.join(STAGES)}")
+    p.add_argument("--repeat", type=int, default=1,
+                   help="runs per case; the fastest is reported")
+    p.add_argument("--fixtures", default=os.path.join(tempfile.gettempdir(),
+                                                      "webp_bench_fixtures"),
+                   help="where generated fixtures are cached")
+    p.add_argument("--timeout", type=float, default=900, help="seconds per case")
+    p.add_argument("-o", "--output", default="bench_results.json")
+    p.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+
+    if args.child:
+        return _child_main(args.child[0], args.child[1:])
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        p.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+
+    paths = ensure_fixtures(Path(args.fixtures), build_specs(args))
+    results = []
+    for path in paths:
+        for stage in stages:
+            # combine pairs the fixture with itself: mixed timing, one encoder
+            inputs = [path, path] if stage == "combine" else [path]
+            best = None
+            for _ in range(max(1, args.repeat)):
+                run = run_case(stage, inputs, args.timeout)
+                if "error" in run or best is None or run["seconds"] < best["seconds"]:
+                    best = run
+                if "error" in run:
+                    break
+            row = {"fixture": Path(path).name, "stage": stage,
+                   "source_mb": round(os.path.getsize(path) / 1e6, 3), **best}
+            results.append(row)
+            if "error" in best:
+                print(f"{row['fixture']:<36} {stage:<12} ERROR {best['error']}",
+                      file=sys.stderr)
+            else:
+                print(f"{row['fixture']:<36} {stage:<12} {best['seconds']:>9.3f}s"
+                      f" {best['fps'] or 0:>9.1f} fps {best['mb_per_s'] or 0:>9.1f} MB/s"
+                      f"  rss {best['peak_rss_mb']} MB", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "pillow": Image.__version__,
+            "ffmpeg": engine.ffmpeg_info()["version"],
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.output}", file=sys.stderr)
+    return 1 if any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+"""Command line front end for the conversion engine (no display needed).
+
+    python -m webp_converter_cli clips/ intro.webp -o out/ -f .webm --json
+
+With --json every engine event is printed to stdout as one JSON object per
+line, followed by a final {"event": "finished", ...} summary.
+
+    python -m webp_converter_cli --watch inbox/ -o out/ --done inbox/done
+
+--watch keeps converting files as they are dropped into the input folders
+until Ctrl+C. --resume finishes the last batch that was interrupted.
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+import multiprocessing
+
+from webp_converter_engine import (
+    MAX_WORKERS, RESAMPLING, RESOLUTION_MAP, SPEED_PROFILES, VALID_FORMATS, WATCH_SETTLE_S,
+    ConversionEngine, JobJournal, list_webps, load_settings, normalize_settings,
+    validate_settings,
+)
+
+
+def collect_inputs(paths) -> tuple:
+    """Expand folders to their .webp files and drop duplicates.
+    Returns (files, skipped_inputs)."""
+    files, skipped, seen = [], [], set()
+    for raw in paths:
+        candidates = list_webps(raw) if os.path.isdir(raw) else [raw]
+        for f in candidates:
+            f = os.path.abspath(f)
+            key = os.path.normcase(f)
+            if key in seen:
+                continue
+            if f.lower().endswith(".webp") and os.path.isfile(f):
+                seen.add(key)
+                files.append(f)
+            else:
+                skipped.append(raw)
+    return files, skipped
+
+
+def _resolution(value: str) -> tuple:
+    """'same', a preset name, or WIDTHxHEIGHT -> (preset, custom_w, custom_h)."""
+    if value.lower() in ("same", "source"):
+        return "Same Resolution", 0, 0
+    for preset in RESOLUTION_MAP:
+        if value.lower() == preset.lower():
+            return preset, 0, 0
+    w, sep, h = value.lower().partition("x")
+    if sep and w.isdigit() and h.isdigit():
+        return "Custom", int(w), int(h)
+    raise argparse.ArgumentTypeError(
+        f"expected same, {', '.join(RESOLUTION_MAP)} or WIDTHxHEIGHT, got {value!r}")
+
+
+def _format(value: str) -> str:
+    fmt = value if value.startswith(".") else f".{value}"
+    if fmt.lower() not in VALID_FORMATS:
+        raise argparse.ArgumentTypeError(
+            f"expected one of {', '.join(VALID_FORMATS)}, got {value!r}")
+    return fmt.lower()
+
+
+def _choice(names):
+    """Case-insensitive argparse type for the keys of names."""
+    def parse(value: str) -> str:
+        for name in names:
+            if value.lower() == name.lower():
+                return name
+        raise argparse.ArgumentTypeError(
+            f"expected one of {', '.join(n.lower() for n in names)}, got {value!r}")
+    return parse
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="webp_converter_cli",
+        description="Convert animated WebP files to mp4/mkv/webm/gif without the GUI.")
+    p.add_argument("inputs", nargs="*", metavar="INPUT",
+                   help=".webp files or folders containing them")
+    p.add_argument("-o", "--output", metavar="DIR",
+                   help="output folder (default: saved folder with --saved, else cwd)")
+    p.add_argument("-f", "--format", type=_format, help="mp4, mkv, webm or gif")
+    p.add_argument("-r", "--resolution", type=_resolution,
+                   help="same, 480p, 720p, 1080p, 4K or WIDTHxHEIGHT")
+    p.add_argument("--crf", type=int, help="compression, 18 (best) to 30 (smallest)")
+    p.add_argument("-s", "--speed", type=_choice(SPEED_PROFILES),
+                   help="encoder speed: fastest, balanced or smallest")
+    p.add_argument("--resample", type=_choice(RESAMPLING),
+                   help="resize quality: fast, balanced (default) or best")
+    p.add_argument("--fps", type=int, help="frame rate when not using source timing")
+    p.add_argument("--fixed-fps", action="store_true",
+                   help="ignore per-frame durations and use --fps for every frame")
+    p.add_argument("--combine", action="store_true",
+                   help="combine all inputs into one output")
+    p.add_argument("--no-stream", action="store_true",
+                   help="stage frames as PNGs on disk instead of piping to ffmpeg")
+    p.add_argument("--no-dedupe", action="store_true",
+                   help="keep repeated consecutive frames instead of merging them")
+    p.add_argument("--dedupe-threshold", type=int, metavar="N",
+                   help="merge frames differing by at most N per channel (default 0)")
+    p.add_argument("--ffmpeg-scale", action="store_true",
+                   help="resize and letterbox in ffmpeg's multithreaded filters "
+                        "instead of Pillow (video formats)")
+    p.add_argument("--gif-full-frames", action="store_true",
+                   help="store every GIF frame whole instead of only the changed region")
+    p.add_argument("-j", "--workers", type=int,
+                   help=f"files converted at once (1-{MAX_WORKERS})")
+    p.add_argument("--frame-threads", type=int, metavar="N",
+                   help="threads resizing frames inside each file (default: auto)")
+    p.add_argument("--encoder-threads", type=int, metavar="N",
+                   help="ffmpeg threads per encode (default: auto)")
+    p.add_argument("--no-cache", action="store_true",
+                   help="always convert, even if an identical job was cached")
+    p.add_argument("--cache-mb", type=int, metavar="MB",
+                   help="output cache size cap (0 disables the cache)")
+    p.add_argument("--temp-dir", metavar="DIR",
+                   help="where --no-stream stages frames, e.g. /dev/shm to keep "
+                        "them in RAM (default: system temp folder)")
+    p.add_argument("--temp-budget-mb", type=int, metavar="MB",
+                   help="--no-stream with -j: pause extracting new files while "
+                        "staged frames would exceed MB (0 = no limit)")
+    p.add_argument("--report", action="store_true",
+                   help="write a per-stage timing report for the job")
+    p.add_argument("--profile", action="store_true",
+                   help="also run every file under cProfile (.prof next to the report)")
+    p.add_argument("--resume", action="store_true",
+                   help="finish the last interrupted batch with its original "
+                        "settings (no inputs needed)")
+    p.add_argument("--watch", action="store_true",
+                   help="keep watching the input folders and convert new files "
+                        "as they arrive (Ctrl+C stops)")
+    p.add_argument("--done", metavar="DIR",
+                   help="--watch: move converted sources here")
+    p.add_argument("--failed", metavar="DIR",
+                   help="--watch: move sources that failed to convert here")
+    p.add_argument("--settle", type=float, default=WATCH_SETTLE_S, metavar="SECONDS",
+                   help="--watch: how long a new file must stop changing before "
+                        f"it is converted (default {WATCH_SETTLE_S:g})")
+    p.add_argument("--poll", action="store_true",
+                   help="--watch: poll instead of using inotify (network shares)")
+    p.add_argument("--saved", action="store_true",
+                   help="start from the settings saved by the GUI")
+    p.add_argument("--json", action="store_true",
+                   help="print machine-readable JSON lines to stdout")
+    return p
+
+
+def settings_from_args(args) -> dict:
+    base = load_settings() if args.saved else {}
+    if args.output:
+        base["output_folder"] = os.path.abspath(args.output)
+    if args.temp_dir:
+        base["temp_dir"] = os.path.abspath(args.temp_dir)
+    overrides = {
+        "format": args.format, "crf": args.crf, "fps": args.fps,
+        "speed": args.speed, "resample": args.resample,
+        "workers": args.workers, "frame_threads": args.frame_threads,
+        "encoder_threads": args.encoder_threads,
+        "cache_mb": args.cache_mb, "dedupe_threshold": args.dedupe_threshold,
+        "temp_budget_mb": args.temp_budget_mb,
+    }
+    base.update({k: v for k, v in overrides.items() if v is not None})
+    if args.resolution:
+        base["resolution"], base["custom_w"], base["custom_h"] = args.resolution
+    if args.fixed_fps:
+        base["source_timing"] = False
+    if args.combine:
+        base["combine"] = True
+    if args.no_stream:
+        base["stream"] = False
+    if args.no_dedupe:
+        base["dedupe"] = False
+    if args.ffmpeg_scale:
+        base["ffmpeg_scale"] = True
+    if args.gif_full_frames:
+        base["gif_delta"] = False
+    if args.no_cache:
+        base["cache"] = False
+    if args.report:
+        base["report"] = True
+    if args.profile:
+        base["profile"] = True
+    settings = normalize_settings(base)
+    if args.output:
+        # normalize_settings falls back to cwd for folders that do not exist
+        settings["output_folder"] = base["output_folder"]
+    return settings
+
+
+class _ConsoleReporter:
+    """Prints engine events either as JSON lines or as a human progress line."""
+
+    def __init__(self, as_json: bool):
+        self.as_json = as_json
+        self._lock = threading.Lock()
+
+    def __call__(self, event: dict):
+        with self._lock:
+            if self.as_json:
+                print(json.dumps(event), flush=True)
+            elif event["event"] == "progress":
+                pct = int(event["fraction"] * 100)
+                sys.stderr.write(f"\r{event['stage']}  ·  {pct}%\033[K")
+                sys.stderr.flush()
+            elif event["event"] == "watching":
+                sys.stderr.write(f"watching {', '.join(event['folders'])} "
+                                 f"({event['backend']}), Ctrl+C to stop\n")
+                sys.stderr.flush()
+            elif event["event"] == "moved" and "error" in event:
+                sys.stderr.write(f"\r\033[Kcould not move {event['file']}: "
+                                 f"{event['error']}\n")
+                sys.stderr.flush()
+            elif event["event"] == "status" and event["status"] in ("done", "error"):
+                name = os.path.basename(event["file"])
+                if event["status"] == "done":
+                    line = f"ok    {name} -> {event.get('output', '')}"
+                else:
+                    line = f"FAIL  {name}: {event.get('error', '')}"
+                sys.stderr.write(f"\r\033[K{line}\n")
+                sys.stderr.flush()
+
+    def finished(self, summary: dict):
+        with self._lock:
+            if self.as_json:
+                print(json.dumps(summary), flush=True)
+            else:
+                cached = summary.get("cached")
+                batches = summary.get("batches")
+                sys.stderr.write(
+                    f"\r\033[K{f'{batches} batches, ' if batches is not None else ''}"
+                    f"{summary['done']} done"
+                    f"{f' ({cached} from cache)' if cached else ''}, "
+                    f"{summary['failed']} failed"
+                    f"{'  (cancelled)' if summary['cancelled'] else ''}\n")
+                if summary.get("report"):
+                    sys.stderr.write(f"timing report: {summary['report']}\n")
+
+
+def _in_background(engine: ConversionEngine, fn, *args) -> dict:
+    """Run fn(*args) off the main thread so Ctrl+C can cancel it cleanly.
+    Returns {"result": ...} or {"error": message}."""
+    outcome: dict = {}
+    finished = threading.Event()
+
+    def work():
+        try:
+            outcome["result"] = fn(*args)
+        except Exception as e:
+            outcome["error"] = str(e)
+        finally:
+            finished.set()
+
+    # an Event rather than Thread.join: a Ctrl+C inside join() can leave
+    # is_alive() reporting False while the thread is still running
+    threading.Thread(target=work, daemon=True).start()
+    while not finished.is_set():
+        try:
+            finished.wait(0.2)
+        except KeyboardInterrupt:
+            engine.cancel()
+    return outcome
+
+
+def watch(args, reporter) -> int:
+    folders = [os.path.abspath(f) for f in args.inputs]
+    for folder in folders:
+        if not os.path.isdir(folder):
+            print(f"--watch needs folders, {folder} is not one", file=sys.stderr)
+            return 2
+    settings = settings_from_args(args)
+    settings["files"] = []
+    try:
+        validate_settings(settings)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    engine = ConversionEngine(on_event=reporter)
+    outcome = _in_background(
+        engine, engine.watch, settings, folders,
+        args.done and os.path.abspath(args.done),
+        args.failed and os.path.abspath(args.failed),
+        max(0.0, args.settle), not args.poll)
+    if "error" in outcome:
+        print(f"error: {outcome['error']}", file=sys.stderr)
+        return 1
+    reporter.finished({"event": "finished", "cancelled": False, **outcome["result"]})
+    return 0
+
+
+def resume(reporter) -> int:
+    journal = JobJournal.latest()
+    if journal is None:
+        print("no interrupted batch to resume", file=sys.stderr)
+        return 2
+    settings = journal.settings()
+    settings["files"] = journal.remaining()
+    try:
+        validate_settings(settings)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    print(f"resuming {len(settings['files'])} file(s) from {journal.path}",
+          file=sys.stderr)
+    engine = ConversionEngine(on_event=reporter)
+    return _finish(reporter, settings["files"],
+                   _in_background(engine, engine.resume, journal))
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    reporter = _ConsoleReporter(args.json)
+    if args.resume:
+        return resume(reporter)
+    if not args.inputs:
+        parser.error("at least one INPUT is required (or --resume)")
+    if args.watch:
+        return watch(args, reporter)
+
+    files, skipped = collect_inputs(args.inputs)
+    for raw in skipped:
+        print(f"skipping {raw}: not a .webp file", file=sys.stderr)
+    if not files:
+        print("no .webp files to convert", file=sys.stderr)
+        return 2
+
+    settings = settings_from_args(args)
+    settings["files"] = files
+    try:
+        validate_settings(settings)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    engine = ConversionEngine(on_event=reporter)
+    return _finish(reporter, files, _in_background(engine, engine.run, settings))
+
+
+def _finish(reporter, files: list, outcome: dict) -> int:
+    """Print the summary of a run() result; returns the exit code."""
+    if "error" in outcome:
+        reporter.finished({"event": "finished", "done": 0, "failed": len(files),
+                           "cancelled": False, "error": outcome["error"]})
+        print(f"error: {outcome['error']}", file=sys.stderr)
+        return 1
+    result = outcome["result"]
+    reporter.finished({
+        "event": "finished",
+        "done": result["done"],
+        "failed": len(result["failures"]),
+        "cancelled": result["cancelled"],
+        "cached": result["cached"],
+        "outputs": result["outputs"],
+        "report": result["report"],
+    })
+    if result["cancelled"]:
+        return 130
+    return 1 if result["failures"] else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
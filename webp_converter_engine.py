@@ -0,0 +1,2758 @@
+"""Headless WebP → video conversion engine.
+
+Nothing in here touches Tk, so it runs the same under the GUI, in worker
+processes, from the command line (webp_converter_cli.py) or on a server.
+
+Modules only some jobs need (imageio_ffmpeg, hashlib, cProfile, Pillow's GIF
+writer) are imported where they are used, which keeps GUI startup and every
+spawned worker process quicker.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import queue
+import shutil
+import select
+import struct
+import threading
+import tempfile
+import subprocess
+import multiprocessing
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait,
+)
+from pathlib import Path
+from PIL import Image, ImageChops, ImageSequence
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ─────────────────────────────────────────────
+# Settings
+# ─────────────────────────────────────────────
+
+def _settings_dir():
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA", os.path.expanduser("~"))
+    elif sys.platform == "darwin":
+        base = os.path.join(os.path.expanduser("~"), "Library", "Application Support")
+    else:
+        base = os.environ.get("XDG_CONFIG_HOME", os.path.join(os.path.expanduser("~"), ".config"))
+    d = os.path.join(base, "WebPConverter")
+    try:
+        os.makedirs(d, exist_ok=True)
+    except OSError:
+        return os.path.abspath(".")
+    return d
+
+
+SETTINGS_FILE = os.path.join(_settings_dir(), "settings.json")
+REPORTS_DIR = os.path.join(os.path.dirname(SETTINGS_FILE), "reports")
+CACHE_DIR = os.path.join(os.path.dirname(SETTINGS_FILE), "cache")
+META_CACHE_FILE = os.path.join(os.path.dirname(SETTINGS_FILE), "meta_cache.json")
+FFMPEG_CACHE_FILE = os.path.join(os.path.dirname(SETTINGS_FILE), "ffmpeg.json")
+JOURNAL_DIR = os.path.join(os.path.dirname(SETTINGS_FILE), "journals")
+JOURNAL_MAX_AGE_S = 7 * 24 * 3600   # older interrupted batches are not offered
+
+MAX_DIMENSION = 7680
+MAX_WORKERS = max(2, min(32, os.cpu_count() or 1))
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 1) // 2))
+MAX_FRAME_THREADS = 8
+
+VALID_FORMATS = (".mp4", ".mkv", ".webm", ".gif")
+VIDEO_CODECS = {
+    ".mp4":  "libx264",
+    ".mkv":  "libx264",
+    ".webm": "libvpx-vp9",
+}
+VALID_RESOLUTIONS = ("Same Resolution", "480p", "720p", "1080p", "4K", "Custom")
+
+# Encoder speed profiles: trade encode time for file size. "Balanced" is what
+# every encode used before profiles existed.
+SPEED_PROFILES = {
+    "Fastest":  {"x264_preset": "ultrafast", "x264_tune": "fastdecode",
+                 "vp9_deadline": "realtime", "vp9_cpu_used": 8},
+    "Balanced": {"x264_preset": "medium", "x264_tune": None,
+                 "vp9_deadline": "good", "vp9_cpu_used": 2},
+    "Smallest": {"x264_preset": "slow", "x264_tune": None,
+                 "vp9_deadline": "good", "vp9_cpu_used": 0},
+}
+
+# Resize filters: (filter, reducing gap). With a gap, sources at least
+# 2 x gap times larger than the target are first shrunk by an integer factor
+# with Image.reduce() (a box average, far cheaper per source pixel) and the
+# filter only runs on the last step. "Best" is the plain LANCZOS every resize
+# used before.
+RESAMPLING = {
+    "Fast":     (Image.BILINEAR, 2.0),
+    "Balanced": (Image.LANCZOS, 2.0),
+    "Best":     (Image.LANCZOS, None),
+}
+
+# ffmpeg scale flags for the same profiles (ffmpeg_scale setting)
+FFMPEG_SCALE_FLAGS = {"Fast": "bilinear", "Balanced": "lanczos", "Best": "lanczos"}
+
+RESOLUTION_MAP = {
+    "480p":  (854,  480),
+    "720p":  (1280, 720),
+    "1080p": (1920, 1080),
+    "4K":    (3840, 2160),
+}
+
+
+DEFAULT_SETTINGS = {
+    "fps":           16,
+    "format":        ".mp4",
+    "crf":           22,
+    "speed":         "Balanced",
+    "resolution":    "Same Resolution",
+    "resample":      "Balanced",        # RESAMPLING key
+    "ffmpeg_scale":  False,          # resize/letterbox in ffmpeg, not Pillow
+    "combine":       False,
+    "source_timing": True,
+    "stream":        True,
+    "workers":       DEFAULT_WORKERS,
+    "frame_threads": 0,              # 0 = share the CPU between parallel files
+    "encoder_threads": 0,            # ffmpeg -threads; 0 = same split as above
+    "report":        False,          # write a timing report per job
+    "profile":       False,          # cProfile every file (implies report)
+    "dedupe":        True,           # merge repeated consecutive frames
+    "dedupe_threshold": 0,           # max per-channel difference still "repeated"
+    "gif_delta":     True,           # GIF frames store only what changed
+    "cache":         True,           # reuse outputs of identical earlier jobs
+    "cache_mb":      1024,
+    "temp_dir":      "",             # staged frames; "" = system temp folder
+    "temp_budget_mb": 0,             # staged bytes in flight at once; 0 = no cap
+    "custom_w":      0,
+    "custom_h":      0,
+}
+
+
+def load_settings():
+    if os.path.exists(SETTINGS_FILE):
+        try:
+            with open(SETTINGS_FILE, "r") as f:
+                data = json.load(f)
+                if isinstance(data, dict):
+                    return data
+        except (json.JSONDecodeError, IOError, OSError):
+            pass
+    return {}
+
+
+def save_settings(data):
+    try:
+        with open(SETTINGS_FILE, "w") as f:
+            json.dump(data, f, indent=2)
+    except (IOError, OSError):
+        pass
+
+
+def _num(value, default, lo, hi):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return default
+    return max(lo, min(hi, int(value)))
+
+
+def _dim(value) -> int:
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return _num(value, 0, 0, MAX_DIMENSION * 2)
+
+
+def normalize_settings(data: dict) -> dict:
+    """Engine settings from saved/user values: defaults filled in, numbers clamped."""
+    d = DEFAULT_SETTINGS
+    fmt = data.get("format", d["format"])
+    res = data.get("resolution", d["resolution"])
+    speed = data.get("speed", d["speed"])
+    resample = data.get("resample", d["resample"])
+    folder = data.get("output_folder", os.getcwd())
+    temp_dir = data.get("temp_dir", d["temp_dir"])
+    return {
+        "fps":           _num(data.get("fps", d["fps"]), d["fps"], 1, 60),
+        "format":        fmt if fmt in VALID_FORMATS else d["format"],
+        "crf":           _num(data.get("crf", d["crf"]), d["crf"], 18, 30),
+        "speed":         speed if speed in SPEED_PROFILES else d["speed"],
+        "resolution":    res if res in VALID_RESOLUTIONS else d["resolution"],
+        "resample":      resample if resample in RESAMPLING else d["resample"],
+        "ffmpeg_scale":  bool(data.get("ffmpeg_scale", d["ffmpeg_scale"])),
+        "combine":       bool(data.get("combine", d["combine"])),
+        "source_timing": bool(data.get("source_timing", d["source_timing"])),
+        "stream":        bool(data.get("stream", d["stream"])),
+        "workers":       _num(data.get("workers", d["workers"]), d["workers"],
+                              1, MAX_WORKERS),
+        "frame_threads": _num(data.get("frame_threads", 0), 0, 0, 64),
+        "encoder_threads": _num(data.get("encoder_threads", 0), 0, 0, 64),
+        "report":        bool(data.get("report", d["report"])),
+        "profile":       bool(data.get("profile", d["profile"])),
+        "dedupe":        bool(data.get("dedupe", d["dedupe"])),
+        "dedupe_threshold": _num(data.get("dedupe_threshold", 0), 0, 0, 64),
+        "gif_delta":     bool(data.get("gif_delta", d["gif_delta"])),
+        "cache":         bool(data.get("cache", d["cache"])),
+        "cache_mb":      _num(data.get("cache_mb", d["cache_mb"]), d["cache_mb"],
+                              0, 1024 * 1024),
+        # kept even if missing, so validate_settings reports it instead of
+        # quietly staging in the system temp folder
+        "temp_dir":      temp_dir if isinstance(temp_dir, str) else "",
+        "temp_budget_mb": _num(data.get("temp_budget_mb", 0), 0, 0, 1024 * 1024),
+        "custom_w":      _dim(data.get("custom_w", 0)),
+        "custom_h":      _dim(data.get("custom_h", 0)),
+        "output_folder": (folder if isinstance(folder, str) and os.path.isdir(folder)
+                          else os.getcwd()),
+    }
+
+
+def validate_settings(settings: dict):
+    """Raise ValueError with a user-facing message if a batch cannot start."""
+    folder = settings["output_folder"]
+    if not os.path.isdir(folder):
+        raise ValueError("Output folder does not exist — choose another")
+    if not os.access(folder, os.W_OK):
+        raise ValueError("Output folder is not writable")
+    if settings["resolution"] == "Custom":
+        w, h = settings["custom_w"], settings["custom_h"]
+        if not (2 <= w <= MAX_DIMENSION and 2 <= h <= MAX_DIMENSION):
+            raise ValueError(f"Custom size must be 2–{MAX_DIMENSION} px")
+    codec = VIDEO_CODECS.get(settings["format"])
+    encoders = None
+    if codec:
+        try:
+            encoders = ffmpeg_info()["encoders"]
+        except RuntimeError:        # imageio_ffmpeg found no binary at all
+            raise ValueError("FFmpeg not found — install it or set "
+                             "IMAGEIO_FFMPEG_EXE") from None
+    if encoders is not None and codec not in encoders:
+        raise ValueError(f"This FFmpeg build has no {codec} encoder — "
+                         "choose another format")
+    temp = temp_root(settings)
+    if not (os.path.isdir(temp) and os.access(temp, os.W_OK)):
+        raise ValueError(f"Temp folder {temp} does not exist or is not "
+                         "writable — choose another")
+    need = staging_estimate(settings)
+    if need:
+        free = shutil.disk_usage(temp).free
+        if need > free:
+            raise ValueError(
+                f"Staged frames may need {need / 1e9:.1f} GB in {temp} but only "
+                f"{free / 1e9:.1f} GB is free — turn streaming on or choose "
+                "another temp folder")
+
+
+def temp_root(settings: dict) -> str:
+    """Where staged frames go: settings["temp_dir"] (e.g. a tmpfs such as
+    /dev/shm) or the system temp folder."""
+    return settings.get("temp_dir") or tempfile.gettempdir()
+
+
+def ffmpeg_resizes(settings: dict) -> bool:
+    """Whether frames go to ffmpeg at source size for it to resize
+    (settings["ffmpeg_scale"] on a video format)."""
+    return settings["ffmpeg_scale"] and settings["format"] in VIDEO_CODECS
+
+
+def staged_bytes(webp_file: str, settings: dict, size: tuple | None = None) -> int:
+    """Upper bound on the temp space one file's staged PNGs take, from the
+    headers alone: frames x w x h x 4 (raw RGBA; PNGs are smaller). size is
+    what the frames are staged at; by default the source size when ffmpeg
+    resizes, else the file's target size. 0 if unreadable."""
+    try:
+        info = parse_webp(webp_file)
+    except (OSError, ValueError, struct.error):
+        return 0
+    if size is None:
+        size = ((info["w"], info["h"]) if ffmpeg_resizes(settings)
+                else Converter.target_size(info["w"], info["h"], settings))
+    return info["frames"] * size[0] * size[1] * 4
+
+
+def staging_estimate(settings: dict) -> int:
+    """Peak temp bytes a batch's staged frames may need; 0 when streaming.
+
+    Combines keep every file's frames until the one encode. Separate files
+    are cleaned up one by one, so the peak is the largest `workers` files at
+    once, capped by temp_budget_mb (a single file bigger than the budget
+    still runs, alone)."""
+    files = settings.get("files") or []
+    if settings["stream"] or not files:
+        return 0
+    if settings["combine"]:
+        try:
+            infos = [parse_webp(f) for f in files]
+        except (OSError, ValueError, struct.error):
+            return 0
+        sources = {(info["w"], info["h"]) for info in infos}
+        # as in _stage_combined: source size only when every file shares it
+        if ffmpeg_resizes(settings) and len(sources) == 1:
+            w, h = sources.pop()
+        else:
+            w, h = Converter.target_size(infos[0]["w"], infos[0]["h"], settings)
+        return sum(info["frames"] for info in infos) * w * h * 4
+    sizes = sorted((staged_bytes(f, settings) for f in files), reverse=True)
+    peak = sum(sizes[:settings["workers"]])
+    budget = settings["temp_budget_mb"] * 1024 * 1024
+    if budget:
+        peak = min(peak, max(budget, sizes[0]))
+    return peak
+
+
+def frame_threads(settings: dict, files_at_once: int | None = None) -> int:
+    """Threads resizing/encoding frames inside one file.
+
+    An explicit settings["frame_threads"] wins; otherwise the CPU is split
+    between the files being converted at the same time.
+    """
+    explicit = settings.get("frame_threads") or 0
+    if explicit > 0:
+        return explicit
+    if files_at_once is None:
+        files_at_once = settings.get("workers", 1)
+    cpus = os.cpu_count() or 1
+    return max(1, min(MAX_FRAME_THREADS, cpus // max(1, files_at_once)))
+
+
+def encoder_threads(settings: dict, files_at_once: int | None = None) -> int:
+    """ffmpeg -threads for one encode; 0 leaves it to ffmpeg.
+
+    An explicit settings["encoder_threads"] wins. A lone encode gets the whole
+    machine; parallel files split the CPU so their encoders do not fight.
+    """
+    explicit = settings.get("encoder_threads") or 0
+    if explicit > 0:
+        return explicit
+    if files_at_once is None:
+        files_at_once = settings.get("workers", 1)
+    if files_at_once <= 1:
+        return 0
+    return max(1, (os.cpu_count() or 1) // files_at_once)
+
+
+def list_webps(folder) -> list[str]:
+    """Sorted .webp files directly inside folder (not recursive)."""
+    return sorted(
+        str(p) for p in Path(folder).iterdir()
+        if p.is_file() and p.suffix.lower() == ".webp"
+    )
+
+
+# ─────────────────────────────────────────────
+# FFmpeg discovery
+# ─────────────────────────────────────────────
+
+_ffmpeg: dict | None = None
+_ffmpeg_lock = threading.Lock()
+
+
+def ffmpeg_info() -> dict:
+    """{"path", "version", "encoders"} for the ffmpeg every encode runs.
+
+    imageio_ffmpeg's lookup plus the -encoders probe cost an import and two
+    process spawns, so the answer is kept for the process and in
+    FFMPEG_CACHE_FILE next to the settings. It is probed again only when the
+    binary's size or mtime changes, or IMAGEIO_FFMPEG_EXE points elsewhere.
+    "encoders" is None when the probe itself failed.
+    """
+    global _ffmpeg
+    with _ffmpeg_lock:
+        if _ffmpeg is None:
+            _ffmpeg = _cached_ffmpeg_info() or _probe_ffmpeg()
+        return _ffmpeg
+
+
+def ffmpeg_exe() -> str:
+    return ffmpeg_info()["path"]
+
+
+def ffmpeg_version() -> tuple | None:
+    """(major, minor) of the ffmpeg in use; None for git snapshots and other
+    builds whose version line has no release number."""
+    m = re.match(r"ffmpeg version n?(\d+)\.(\d+)", ffmpeg_info()["version"])
+    return (int(m[1]), int(m[2])) if m else None
+
+
+def _ffmpeg_stamp(path: str) -> list | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns, os.environ.get("IMAGEIO_FFMPEG_EXE")]
+
+
+def _cached_ffmpeg_info() -> dict | None:
+    try:
+        with open(FFMPEG_CACHE_FILE, "r") as f:
+            data = json.load(f)
+        info = data["info"]
+        if data["stamp"] == _ffmpeg_stamp(info["path"]):
+            return info
+    except (json.JSONDecodeError, IOError, OSError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _probe_ffmpeg() -> dict:
+    import imageio_ffmpeg
+
+    path = imageio_ffmpeg.get_ffmpeg_exe()
+    info = {"path": path, "version": "", "encoders": None}
+    try:
+        out = subprocess.run([path, "-hide_banner", "-encoders"],
+                             stdout=subprocess.PIPE, text=True, timeout=20,
+                             **Converter._popen_kwargs()).stdout
+        # " V....D libx264   libx264 H.264 / AVC ..." after a "------" rule
+        listing = out.partition("------")[2]
+        info["encoders"] = sorted(line.split()[1] for line in listing.splitlines()
+                                  if len(line.split()) > 1)
+        out = subprocess.run([path, "-version"], stdout=subprocess.PIPE,
+                             text=True, timeout=20,
+                             **Converter._popen_kwargs()).stdout
+        info["version"] = out.splitlines()[0] if out else ""
+    except (OSError, subprocess.SubprocessError):
+        return info   # not cached: try again next run
+    stamp = _ffmpeg_stamp(path)
+    if stamp and info["encoders"]:
+        tmp = f"{FFMPEG_CACHE_FILE}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"stamp": stamp, "info": info}, f)
+            os.replace(tmp, FFMPEG_CACHE_FILE)
+        except (IOError, OSError):
+            pass
+    return info
+
+
+def _u24(b: bytes, offset: int) -> int:
+    return b[offset] | b[offset + 1] << 8 | b[offset + 2] << 16
+
+
+def parse_webp(path: str) -> dict:
+    """Read size, frame count, per-frame durations and alpha from the RIFF
+    chunks alone: {w, h, frames, durations, alpha, animated}.
+
+    Only chunk headers (and 16 bytes of each ANMF) are read; no pixel data
+    is decoded, so the cost does not depend on resolution. Raises ValueError
+    for anything that does not look like a well-formed WebP.
+    """
+    with open(path, "rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:] != b"WEBP":
+            raise ValueError("not a RIFF/WEBP file")
+        riff_end = 8 + struct.unpack("<I", header[4:8])[0]
+        file_end = f.seek(0, os.SEEK_END)
+        end = min(riff_end, file_end)
+        pos = 12
+        info = {"w": 0, "h": 0, "frames": 0, "durations": [], "alpha": False,
+                "animated": False}
+        while pos + 8 <= end:
+            f.seek(pos)
+            fourcc, size = struct.unpack("<4sI", f.read(8))
+            if pos + 8 + size > end:
+                raise ValueError(f"truncated {fourcc!r} chunk")
+            head = f.read(min(size, 16))
+            if fourcc == b"VP8X":
+                if size < 10:
+                    raise ValueError("short VP8X chunk")
+                info["alpha"] = bool(head[0] & 0x10)
+                info["animated"] = bool(head[0] & 0x02)
+                info["w"], info["h"] = _u24(head, 4) + 1, _u24(head, 7) + 1
+            elif fourcc == b"ANMF":
+                if size < 16:
+                    raise ValueError("short ANMF chunk")
+                info["frames"] += 1
+                info["durations"].append(_u24(head, 12))
+            elif fourcc in (b"VP8 ", b"VP8L") and not info["animated"]:
+                if not info["w"]:
+                    info["w"], info["h"], alpha = _bitstream_size(fourcc, head)
+                    info["alpha"] = info["alpha"] or alpha
+                info["frames"] = 1
+                info["durations"] = [0]
+            pos += 8 + size + (size & 1)
+    if not info["frames"] or info["w"] <= 0 or info["h"] <= 0:
+        raise ValueError("no frames found")
+    return info
+
+
+def _bitstream_size(fourcc: bytes, head: bytes) -> tuple:
+    """(w, h, alpha) from the first bytes of a VP8 or VP8L bitstream."""
+    if fourcc == b"VP8 ":
+        if len(head) < 10 or head[3:6] != b"\x9d\x01\x2a":
+            raise ValueError("bad VP8 frame header")
+        w, h = struct.unpack("<HH", head[6:10])
+        return w & 0x3FFF, h & 0x3FFF, False
+    if len(head) < 5 or head[0] != 0x2F:
+        raise ValueError("bad VP8L signature")
+    bits = struct.unpack("<I", head[1:5])[0]
+    return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, bool(bits >> 28 & 1)
+
+
+def read_meta(path: str) -> dict:
+    """Queue metadata: {size_mb, frames, w, h, total_ms, durations, alpha};
+    zeros if unreadable.
+
+    parse_webp answers from the container headers; Pillow (a full decode)
+    is only used for files it cannot parse.
+    """
+    meta = {"size_mb": 0.0, "frames": 0, "w": 0, "h": 0, "total_ms": 0,
+            "durations": [], "alpha": False}
+    try:
+        meta["size_mb"] = os.path.getsize(path) / (1024 * 1024)
+    except OSError:
+        pass
+    try:
+        info = parse_webp(path)
+    except (OSError, ValueError, struct.error):
+        info = None
+    if info is not None:
+        meta.update(w=info["w"], h=info["h"], frames=info["frames"],
+                    durations=info["durations"], alpha=info["alpha"],
+                    total_ms=sum(info["durations"]))
+        return meta
+    try:
+        with Image.open(path) as im:
+            meta["w"], meta["h"] = im.width, im.height
+            meta["alpha"] = "A" in im.mode or "transparency" in im.info
+            n = getattr(im, "n_frames", 1)
+            durations = []
+            for i in range(n):
+                im.seek(i)
+                im.load()  # duration only populated after load
+                durations.append(int(im.info.get("duration", 0) or 0))
+            meta["frames"] = n
+            meta["durations"] = durations
+            meta["total_ms"] = sum(durations)
+    except Exception:
+        pass
+    return meta
+
+
+class MetaCache:
+    """read_meta results kept between sessions in META_CACHE_FILE.
+
+    Entries are keyed by absolute path and only trusted while the file's size
+    and mtime are unchanged. The least recently used entries are dropped
+    beyond max_entries when saving. Safe to use from several threads.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str = META_CACHE_FILE, max_entries: int = 20000):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: dict | None = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+                if data.get("version") == self.VERSION:
+                    self._entries = data["entries"]
+            except (json.JSONDecodeError, IOError, OSError, KeyError,
+                    AttributeError):
+                pass
+        return self._entries
+
+    def lookup(self, path: str) -> dict | None:
+        """Cached metadata, or None if missing or the file has changed."""
+        key = self._key(path)
+        with self._lock:
+            entry = self._load().get(key)
+        if entry is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if (st.st_size, st.st_mtime_ns) != (entry["size"], entry["mtime_ns"]):
+            return None
+        with self._lock:                # save() may be serializing entries
+            entry["used"] = time.time()
+        return entry["meta"]
+
+    def get(self, path: str) -> dict:
+        """Metadata for path, from the cache when the file is unchanged."""
+        meta = self.lookup(path)
+        if meta is not None:
+            return meta
+        try:
+            st = os.stat(path)
+        except OSError:
+            return read_meta(path)
+        meta = read_meta(path)
+        with self._lock:
+            self._load()[self._key(path)] = {
+                "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                "used": time.time(), "meta": meta,
+            }
+            self._dirty = True
+        return meta
+
+    def save(self):
+        """Write the index if anything was added, trimming it first."""
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = self._load()
+            if len(entries) > self.max_entries:
+                keep = sorted(entries, key=lambda k: entries[k]["used"],
+                              reverse=True)[:self.max_entries]
+                self._entries = entries = {k: entries[k] for k in keep}
+            data = {"version": self.VERSION, "entries": entries}
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp, "w") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                os.replace(tmp, self.path)
+                self._dirty = False
+            except (IOError, OSError):
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+
+
+# ─────────────────────────────────────────────
+# Geometry and image helpers
+# ─────────────────────────────────────────────
+
+def make_even(w: int, h: int) -> tuple:
+    return w if w % 2 == 0 else w + 1, h if h % 2 == 0 else h + 1
+
+
+def fit_box(w, h, box_w, box_h):
+    """Largest even size fitting inside box while keeping aspect ratio."""
+    if w <= 0 or h <= 0:
+        return make_even(box_w, box_h)
+    ratio = min(box_w / w, box_h / h)
+    return make_even(max(2, round(w * ratio)), max(2, round(h * ratio)))
+
+
+def resize_frame(img: Image.Image, size: tuple,
+                 resample: str = "Balanced") -> Image.Image:
+    """img resized to size with a RESAMPLING profile.
+
+    Pillow drops reducing_gap for RGBA (it resizes a premultiplied copy
+    without it), so the reduce() step is done here, on premultiplied alpha
+    like Pillow's own resize, so transparent pixels do not bleed colour.
+    """
+    if img.size == size:
+        return img
+    resample_filter, gap = RESAMPLING[resample]
+    fx = int(img.width / size[0] / gap) if gap else 1
+    fy = int(img.height / size[1] / gap) if gap else 1
+    if fx <= 1 and fy <= 1:
+        return img.resize(size, resample_filter)
+    fx, fy = max(1, fx), max(1, fy)
+    premultiplied = img.mode == "RGBA"
+    small = (img.convert("RGBa") if premultiplied else img).reduce((fx, fy))
+    # the box keeps the geometry exact when the size is not a multiple
+    small = small.resize(size, resample_filter,
+                         box=(0, 0, img.width / fx, img.height / fy))
+    return small.convert("RGBA") if premultiplied else small
+
+
+def frames_match(a: Image.Image, b: Image.Image, threshold: int = 0) -> bool:
+    """True if no channel of any pixel differs by more than threshold."""
+    if a.size != b.size or a.mode != b.mode:
+        return False
+    extrema = ImageChops.difference(a, b).getextrema()
+    return max(hi for _, hi in extrema) <= threshold
+
+
+class LetterboxPlan:
+    """Aspect-fit frames of one source size into a target canvas, centered on
+    opaque black.
+
+    The fitted size and offsets are worked out once per source. Each thread
+    keeps one canvas per plan with the bars already painted, and apply()
+    only redraws the picture area: opaque frames are pasted straight over
+    it, others are blended onto black as before. The returned image is that
+    shared canvas, so use it before the same thread calls apply() again.
+    """
+
+    def __init__(self, src_size: tuple, target: tuple, resample: str = "Balanced"):
+        self.target = target
+        self.resample = resample
+        self.size = fit_box(*src_size, *target)
+        x, y = (target[0] - self.size[0]) // 2, (target[1] - self.size[1]) // 2
+        self.box = (x, y, x + self.size[0], y + self.size[1])
+        self._local = threading.local()
+
+    def apply(self, img: Image.Image) -> Image.Image:
+        if img.size == self.target:
+            return img
+        fitted = resize_frame(img, self.size, self.resample)
+        opaque = fitted.getchannel("A").getextrema()[0] == 255
+        if opaque and self.size == self.target:
+            return fitted
+        canvas = getattr(self._local, "canvas", None)
+        if canvas is None:
+            canvas = self._local.canvas = Image.new("RGBA", self.target, (0, 0, 0, 255))
+        if opaque:
+            canvas.paste(fitted, self.box)
+        else:
+            canvas.paste((0, 0, 0, 255), self.box)
+            canvas.paste(fitted, self.box, fitted)
+        return canvas
+
+
+def letterbox(img: Image.Image, target: tuple) -> Image.Image:
+    """Aspect-fit img inside target canvas, centered on opaque black."""
+    return LetterboxPlan(img.size, target).apply(img)
+
+
+def unique_output_path(folder: str, stem: str, ext: str,
+                       taken: set = frozenset(), same_as: str | None = None) -> str:
+    """First free `stem (n).ext` in folder, also avoiding paths in taken.
+
+    With same_as, an existing candidate with the same content as same_as is
+    returned instead, so re-running a cached job does not pile up copies.
+    """
+    safe = re.sub(r'[<>:"/\\|?*\x00-\x1f]', "_", stem).strip() or "output"
+    path = os.path.join(folder, f"{safe}{ext}")
+    n = 1
+    while os.path.exists(path) or path in taken:
+        if same_as and path not in taken and _same_content(path, same_as):
+            return path
+        path = os.path.join(folder, f"{safe} ({n}){ext}")
+        n += 1
+    return path
+
+
+def _same_content(a: str, b: str) -> bool:
+    import filecmp
+    try:
+        return filecmp.cmp(a, b, shallow=False)
+    except OSError:
+        return False
+
+
+FICLONE = 0x40049409             # Linux ioctl: clone a whole file (reflink)
+
+
+def clone_file(src: str, dest: str):
+    """Copy src to dest, as a copy-on-write clone where the filesystem
+    supports it (Btrfs, XFS, ...). Unlike a hard link, later edits to either
+    file never show up in the other."""
+    with open(src, "rb") as fsrc, open(dest, "wb") as fdest:
+        if sys.platform.startswith("linux"):
+            import fcntl
+            try:
+                fcntl.ioctl(fdest.fileno(), FICLONE, fsrc.fileno())
+                return
+            except OSError:
+                pass
+        try:
+            shutil.copyfileobj(fsrc, fdest, 1024 * 1024)
+        except OSError:
+            fdest.close()
+            os.remove(dest)
+            raise
+
+
+GIF_TRANSPARENT = 255            # palette index kept free for transparent pixels
+GIF_PALETTE_SAMPLES = 32         # frames sampled for a GIF's shared palette
+GIF_SAMPLE_SIZE = (160, 160)     # each sample is thumbnailed to fit this box
+
+
+def spread(total: int, count: int) -> list[int]:
+    """Up to count indices spaced evenly over range(total), starting at 0."""
+    count = min(total, count)
+    return [k * total // count for k in range(count)]
+
+
+def gif_sample(img: Image.Image) -> Image.Image:
+    """Small RGB copy of a frame, for gif_palette."""
+    sample = img.convert("RGB")
+    sample.thumbnail(GIF_SAMPLE_SIZE, Image.BILINEAR)
+    return sample
+
+
+def gif_palette(samples: list[Image.Image]) -> Image.Image:
+    """One 255-colour palette (as a P image) for a whole GIF, quantized from a
+    mosaic of gif_sample() frames. Index 255 is never assigned, so it stays
+    free for transparency."""
+    if not samples:
+        raise ValueError("no frames to build a palette from")
+    w = max(s.width for s in samples)
+    mosaic = Image.new("RGB", (w, sum(s.height for s in samples)))
+    y = 0
+    for s in samples:
+        # narrower samples (mixed sizes) repeat their edge instead of adding black
+        mosaic.paste(s.resize((w, s.height)) if s.width != w else s, (0, y))
+        y += s.height
+    return mosaic.quantize(colors=255, method=Image.Quantize.MEDIANCUT)
+
+
+def rgba_to_gif_frame(img: Image.Image,
+                      palette: Image.Image | None = None) -> Image.Image:
+    """Quantize RGBA to palette frame with binary transparency at index 255.
+
+    With a gif_palette() image every frame maps onto that shared palette
+    (no dithering, so flat areas do not shimmer between frames); without
+    one the frame gets its own adaptive palette.
+    """
+    alpha = img.getchannel("A")
+    mask = alpha.point(lambda a: 255 if a <= 128 else 0)
+    if palette is not None:
+        frame = img.convert("RGB").quantize(palette=palette,
+                                            dither=Image.Dither.NONE)
+    else:
+        frame = img.convert("RGB").convert("P", palette=Image.Palette.ADAPTIVE,
+                                           colors=255)
+    frame.paste(GIF_TRANSPARENT, mask)
+    frame.info["transparency"] = GIF_TRANSPARENT
+    return frame
+
+
+# point() tables over palette indices (or over index differences for _SAME)
+_OPAQUE = [0 if i == GIF_TRANSPARENT else 255 for i in range(256)]
+_CLEAR = [255 if i == GIF_TRANSPARENT else 0 for i in range(256)]
+_SAME = [255] + [0] * 255
+
+
+class GifWriter:
+    """Writes an animated GIF one frame at a time, so memory stays at one
+    frame however long the animation is.
+
+    Every frame must be quantized against the same gif_palette(); the first
+    frame's palette becomes the global colour table. Delays are rounded to
+    GIF's centiseconds on the running total, so long clips do not drift.
+
+    With delta=True only the first frame covers the canvas: later frames store
+    the rectangle that changed since the frame before, with unchanged pixels
+    inside it left transparent so they compress to almost nothing. A pixel
+    that turns transparent cannot be drawn over, so the frame before it is
+    disposed to background over a rectangle widened to cover such pixels.
+    That choice needs the next frame, so one frame is held back. Frames
+    identical to the one on screen just extend its delay.
+    """
+
+    def __init__(self, path: str, loop: int = 0, delta: bool = False):
+        self.path = path
+        self.loop = loop
+        self.delta = delta
+        self.frames = 0
+        self._fp = open(path, "wb")
+        self._elapsed_ms = 0.0
+        self._elapsed_cs = 0
+        # held-back frame: [frame, base it is drawn over, box, delay_cs, disposal]
+        self._pending: list | None = None
+
+    def add(self, frame: Image.Image, duration_ms: float):
+        self._elapsed_ms += duration_ms
+        # browsers play delays under 20 ms as 100 ms, so clamp like before
+        cs = max(2, round(self._elapsed_ms / 10) - self._elapsed_cs)
+        self._elapsed_cs += cs
+        if not self.delta:
+            self._write(frame, None, None, cs, 2)
+            return
+        pending = self._pending
+        if pending is None:
+            self._pending = [frame, None, None, cs, 1]
+            return
+        prev = base = pending[0]
+        cleared = ImageChops.multiply(prev.point(_OPAQUE, "L"),
+                                      frame.point(_CLEAR, "L")).getbbox()
+        if cleared:
+            box = pending[2] or (0, 0) + prev.size
+            pending[2] = (min(box[0], cleared[0]), min(box[1], cleared[1]),
+                          max(box[2], cleared[2]), max(box[3], cleared[3]))
+            pending[4] = 2
+            base = prev.copy()
+            base.paste(GIF_TRANSPARENT, pending[2])
+        box = ImageChops.difference(base, frame).getbbox()
+        if box is None:
+            if pending[4] == 1:
+                pending[3] += cs
+                return
+            box = (0, 0, 1, 1)  # all on screen already, but the delay needs a frame
+        self._write(*pending)
+        self._pending = [frame, base, box, cs, 1]
+
+    def _write(self, frame, base, box, cs, disposal):
+        if not self.frames:
+            from PIL import GifImagePlugin
+            header, _ = GifImagePlugin.getheader(
+                frame.copy(), info={"loop": self.loop, "optimize": False,
+                                    "transparency": GIF_TRANSPARENT})
+            self._fp.write(b"".join(header))
+        offset = (0, 0)
+        if box is not None:
+            frame = frame.crop(box)
+            offset = box[:2]
+            if base is not None:
+                same = ImageChops.difference(base.crop(box), frame)
+                frame.paste(GIF_TRANSPARENT, same.point(_SAME, "L"))
+        from PIL import GifImagePlugin
+        for chunk in GifImagePlugin.getdata(frame, offset, duration=cs * 10,
+                                            disposal=disposal,
+                                            transparency=GIF_TRANSPARENT):
+            self._fp.write(chunk)
+        self.frames += 1
+
+    def close(self):
+        if self._fp.closed:
+            return
+        try:
+            if self._pending is not None:
+                self._write(*self._pending)
+                self._pending = None
+            if self.frames:
+                self._fp.write(b";")  # trailer
+        finally:
+            self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ── Raw frame streaming ───────────────────────
+# Frames are piped to ffmpeg as a minimal Matroska stream holding uncompressed
+# RGBA blocks. Unlike plain rawvideo, every block carries its own timestamp and
+# duration, so variable frame timing survives without temp files.
+
+MKV_TIMESCALE_NS = 1000          # timestamps and durations in microseconds
+STREAM_MIN_FFMPEG = (5, 1)       # -fps_mode and -enc_time_base; older builds stage
+MP4_END_FRAMES = 3               # 1 ms pieces the last frame ends on in an mp4
+                                 # (x264 B-frame pyramids delay decode order by 2)
+
+
+def _ebml_size(n: int) -> bytes:
+    for length in range(1, 9):
+        if n < (1 << (7 * length)) - 1:
+            return ((1 << (7 * length)) | n).to_bytes(length, "big")
+    raise ValueError(f"EBML size too large: {n}")
+
+
+def _ebml(eid: bytes, payload) -> bytes:
+    if isinstance(payload, int):
+        payload = payload.to_bytes(max(1, (payload.bit_length() + 7) // 8), "big")
+    elif isinstance(payload, str):
+        payload = payload.encode("ascii")
+    return eid + _ebml_size(len(payload)) + payload
+
+
+def mkv_stream_header(width: int, height: int) -> bytes:
+    """EBML header, open-ended Segment and a single uncompressed RGBA track."""
+    ebml = _ebml(b"\x1a\x45\xdf\xa3",
+                 _ebml(b"\x42\x86", 1) + _ebml(b"\x42\xf7", 1)
+                 + _ebml(b"\x42\xf2", 4) + _ebml(b"\x42\xf3", 8)
+                 + _ebml(b"\x42\x82", "matroska")
+                 + _ebml(b"\x42\x87", 4) + _ebml(b"\x42\x85", 2))
+    segment = b"\x18\x53\x80\x67" + b"\x01\xff\xff\xff\xff\xff\xff\xff"
+    info = _ebml(b"\x15\x49\xa9\x66",
+                 _ebml(b"\x2a\xd7\xb1", MKV_TIMESCALE_NS)
+                 + _ebml(b"\x4d\x80", "WebPConverter")
+                 + _ebml(b"\x57\x41", "WebPConverter"))
+    video = _ebml(b"\xe0",
+                  _ebml(b"\xb0", width) + _ebml(b"\xba", height)
+                  + _ebml(b"\x2e\xb5\x24", b"RGBA"))
+    track = _ebml(b"\xae",
+                  _ebml(b"\xd7", 1) + _ebml(b"\x73\xc5", 1) + _ebml(b"\x83", 1)
+                  + _ebml(b"\x9c", 0) + _ebml(b"\x86", "V_UNCOMPRESSED") + video)
+    return ebml + segment + info + _ebml(b"\x16\x54\xae\x6b", track)
+
+
+def mkv_frame_header(pts_us: int, duration_us: int, nbytes: int) -> tuple:
+    """(prefix, suffix) to write around nbytes of raw RGBA for one frame.
+
+    Each frame gets its own Cluster so the relative block timestamp stays 0.
+    """
+    block_head = b"\x81\x00\x00\x00"          # track 1, rel. timestamp 0, no flags
+    duration = _ebml(b"\x9b", duration_us)
+    block_len = len(block_head) + nbytes
+    block = b"\xa1" + _ebml_size(block_len) + block_head
+    group_len = len(block) + nbytes + len(duration)
+    group = b"\xa0" + _ebml_size(group_len)
+    timecode = _ebml(b"\xe7", pts_us)
+    cluster = b"\x1f\x43\xb6\x75" + _ebml_size(len(timecode) + len(group) + group_len)
+    return cluster + timecode + group + block, duration
+
+
+# ─────────────────────────────────────────────
+# Timing and profiling
+# ─────────────────────────────────────────────
+
+def _children_cpu() -> float | None:
+    """CPU seconds used by finished child processes (ffmpeg), if measurable."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class StageTimer:
+    """Wall and CPU seconds per pipeline stage for one file (or combined job).
+
+    Stages: decode, convert (to RGBA), dedupe, resize / letterbox, save (PNG or raw
+    bytes), pipe (writes into ffmpeg's stdin, so it includes time ffmpeg made
+    us wait), palette and quantize (streamed GIF), encode and cleanup, plus
+    wait (for room in the temp budget in parallel batches). Frame threads add to the same stages at
+    once, so a stage's wall total can exceed the file's elapsed time.
+    """
+
+    def __init__(self):
+        self.stages: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._wall0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        self._children0 = _children_cpu()
+
+    @contextmanager
+    def stage(self, name: str):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - wall, time.thread_time() - cpu)
+
+    def add(self, name: str, wall: float, cpu: float):
+        with self._lock:
+            entry = self.stages.setdefault(name, {"wall": 0.0, "cpu": 0.0,
+                                                  "calls": 0})
+            entry["wall"] += wall
+            entry["cpu"] += cpu
+            entry["calls"] += 1
+
+    def summary(self) -> dict:
+        children = _children_cpu()
+        with self._lock:
+            stages = {name: {"wall": round(e["wall"], 4), "cpu": round(e["cpu"], 4),
+                             "calls": e["calls"]}
+                      for name, e in self.stages.items()}
+        return {
+            "elapsed": round(time.perf_counter() - self._wall0, 4),
+            "cpu": round(time.process_time() - self._cpu0, 4),
+            # RUSAGE_CHILDREN only counts reaped children: exact while one file
+            # runs per process, which is how both batch paths work
+            "ffmpeg_cpu": (round(children - self._children0, 4)
+                           if children is not None else None),
+            "stages": stages,
+        }
+
+
+def run_profiled(profile_path: str | None, fn, *args, **kwargs):
+    """Call fn, under cProfile when profile_path is set (stats dumped there).
+
+    cProfile only sees the calling thread; frame-thread work (resize, save)
+    shows up in the StageTimer totals but not in the profile unless
+    frame_threads is 1.
+    """
+    if not profile_path:
+        return fn(*args, **kwargs)
+    import cProfile
+    prof = cProfile.Profile()
+    try:
+        return prof.runcall(fn, *args, **kwargs)
+    finally:
+        try:
+            prof.dump_stats(profile_path)
+        except OSError:
+            pass
+
+
+def write_job_report(report: dict, job_id: str) -> str | None:
+    """Save a job report as REPORTS_DIR/<job_id>.json; returns its path."""
+    path = os.path.join(REPORTS_DIR, f"{job_id}.json")
+    try:
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    except (IOError, OSError):
+        return None
+    return path
+
+
+# ─────────────────────────────────────────────
+# Output cache
+# ─────────────────────────────────────────────
+
+class OutputCache:
+    """Content-addressed store of finished outputs, trimmed LRU to a size cap.
+
+    Keys hash the source bytes plus every setting that changes the result, so
+    renamed or re-queued copies of a file hit the same entry. Entries are
+    private copies named <key><ext> (never links to user outputs, which may be
+    edited later) and their atime is the LRU clock, so worker processes and
+    later runs share the folder without an index file.
+    """
+
+    VERSION = 2   # bump when encoder changes make old entries stale
+    # stream too: piped and staged encodes differ (frame timing, CFR vs VFR)
+    OUTPUT_KEYS = ("format", "crf", "speed", "fps", "source_timing", "resolution",
+                   "resample", "ffmpeg_scale", "custom_w", "custom_h", "dedupe",
+                   "dedupe_threshold", "gif_delta", "stream")
+
+    def __init__(self, folder: str = CACHE_DIR, max_bytes: int = 1024 ** 3):
+        self.folder = folder
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def source_digest(path: str) -> str:
+        import hashlib
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def key(self, digests: list, settings: dict) -> str:
+        """Cache key for the output built from these sources (in order)."""
+        params = {k: settings[k] for k in self.OUTPUT_KEYS}
+        if settings["resolution"] != "Custom":
+            params["custom_w"] = params["custom_h"] = 0
+        params["combine"] = len(digests) > 1
+        import hashlib
+        blob = json.dumps([self.VERSION, digests, params], sort_keys=True)
+        return hashlib.sha256(blob.encode()).hexdigest()[:40]
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.folder, key + ext)
+
+    def lookup(self, key: str, ext: str) -> str | None:
+        """Path of the cached output, or None. Marks the entry as used."""
+        path = self._path(key, ext)
+        try:
+            self._touch(path)
+        except OSError:
+            return None
+        return path
+
+    @staticmethod
+    def _touch(path: str):
+        os.utime(path, (time.time(), os.stat(path).st_mtime))
+
+    def store(self, key: str, ext: str, output_path: str):
+        """Add a finished output, then trim the cache. Failures are ignored:
+        the cache only ever saves work, it never loses any."""
+        if self.max_bytes <= 0:
+            return
+        path = self._path(key, ext)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            clone_file(output_path, tmp)
+            os.replace(tmp, path)
+            self._touch(path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until under max_bytes."""
+        entries = []
+        try:
+            with os.scandir(self.folder) as it:
+                for entry in it:
+                    if entry.is_file() and not entry.name.endswith(".tmp"):
+                        st = entry.stat()
+                        entries.append((st.st_atime, st.st_size, entry.path))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+# ─────────────────────────────────────────────
+# Conversion (UI-independent)
+# ─────────────────────────────────────────────
+
+class Converter:
+    """Frame extraction and encoding, free of any Tk state.
+
+    ``cancelled`` is polled between frames; ``terminate()`` kills the running
+    ffmpeg so a cancel takes effect mid-encode. Instances are cheap and are
+    created per worker process for parallel batches.
+
+    While ``timer`` holds a StageTimer, every stage adds its time to it.
+    """
+
+    def __init__(self, cancelled=lambda: False):
+        self.cancelled = cancelled
+        self.ffmpeg_proc = None
+        self.timer: StageTimer | None = None
+        self.temp_budget: TempBudget | None = None   # set in pool workers
+
+    def _stage(self, name: str):
+        return self.timer.stage(name) if self.timer else nullcontext()
+
+    def terminate(self):
+        proc = self.ffmpeg_proc
+        if proc:
+            try:
+                proc.terminate()
+            except OSError:
+                pass
+
+    def convert_file(self, webp_file: str, output_path: str, temp_dir: Path,
+                     settings: dict, progress=None,
+                     profile_path: str | None = None) -> dict:
+        """Convert one file to output_path. Raises on failure.
+
+        Returns the StageTimer summary for the file; with profile_path the
+        conversion also runs under cProfile and the stats are dumped there.
+        """
+        self.timer = StageTimer()
+        try:
+            run_profiled(profile_path, self._convert_file, webp_file,
+                         output_path, temp_dir, settings, progress)
+            return self.timer.summary()
+        finally:
+            self.timer = None
+
+    def _convert_file(self, webp_file, output_path, temp_dir, settings,
+                      progress=None):
+        if settings["stream"]:
+            self.stream_encode(webp_file, output_path, settings, progress)
+            return
+
+        def half(offset):
+            return (lambda p: progress((offset + p) / 2)) if progress else None
+
+        budget = self.temp_budget
+        if budget is None:
+            self._stage_file(webp_file, output_path, temp_dir, settings, half)
+            return
+        nbytes = staged_bytes(webp_file, settings)
+        with self._stage("wait"):
+            if not budget.acquire(nbytes, self.cancelled):
+                return
+        try:
+            self._stage_file(webp_file, output_path, temp_dir, settings, half)
+        finally:
+            budget.release(nbytes)
+
+    def _stage_file(self, webp_file, output_path, temp_dir, settings, half):
+        frames = []
+        try:
+            native = self._native_size([webp_file], settings)
+            vf = native and self._scale_filter(
+                native, self.target_size(*native, settings), False, settings)
+            frames = self.extract_frames(webp_file, temp_dir, settings,
+                                         progress=half(0), fit=not native)
+            if self.cancelled():
+                return
+            if not frames:
+                raise RuntimeError("no frames decoded")
+            self.encode(frames, output_path, settings, progress=half(1), vf=vf)
+        finally:
+            # free disk space before next file
+            with self._stage("cleanup"):
+                for frame_path, *_ in frames:
+                    try:
+                        os.remove(frame_path)
+                    except OSError:
+                        pass
+
+    def _native_size(self, webp_files: list, settings: dict) -> tuple | None:
+        """The shared source size when ffmpeg should resize instead of Pillow
+        (settings["ffmpeg_scale"]), else None. Frames reach ffmpeg as one
+        stream of a single size, so combines of mixed sizes and GIFs (written
+        here, not by ffmpeg) are still fitted in Pillow."""
+        if not ffmpeg_resizes(settings):
+            return None
+        sizes = set()
+        for webp_file in webp_files:
+            with self._file_errors(webp_file, len(webp_files)):
+                with Image.open(webp_file) as im:
+                    sizes.add(im.size)
+            if len(sizes) > 1:
+                return None
+        return sizes.pop()
+
+    @staticmethod
+    def _scale_filter(src_size: tuple, target: tuple, letterboxed: bool,
+                      settings: dict) -> str | None:
+        """-vf doing in ffmpeg what _fit() does in Pillow; the geometry still
+        comes from target_size() and fit_box(). None if nothing changes."""
+        if src_size == target:
+            return None
+        w, h = fit_box(*src_size, *target) if letterboxed else target
+        # swscale runs single-threaded unless asked; 0 = one thread per core
+        vf = (f"scale={w}:{h}:flags={FFMPEG_SCALE_FLAGS[settings['resample']]}"
+              f":threads={settings.get('encoder_threads') or 0}")
+        if (w, h) != target:
+            vf += (f",pad={target[0]}:{target[1]}:{(target[0] - w) // 2}"
+                   f":{(target[1] - h) // 2}:color=black")
+        # scale keeps the picture's shape by changing the pixel aspect ratio
+        # when stretching; Pillow's frames have square pixels, so match them
+        return vf + ",setsar=1"
+
+    @staticmethod
+    def target_size(src_w: int, src_h: int, settings: dict) -> tuple:
+        preset = settings["resolution"]
+        if preset == "Custom":
+            return make_even(settings["custom_w"], settings["custom_h"])
+        if preset in RESOLUTION_MAP:
+            return fit_box(src_w, src_h, *RESOLUTION_MAP[preset])
+        return make_even(src_w, src_h)
+
+    # ── Frame extraction ─────────────────────
+
+    @staticmethod
+    def _fit(img: Image.Image, target: tuple, plan: LetterboxPlan | None,
+             resample: str = "Balanced") -> Image.Image:
+        if plan is not None:
+            return plan.apply(img)
+        return resize_frame(img, target, resample)
+
+    def _timed_fit(self, img: Image.Image, target: tuple,
+                   plan: LetterboxPlan | None, resample: str) -> Image.Image:
+        with self._stage("letterbox" if plan else "resize"):
+            return self._fit(img, target, plan, resample)
+
+    def _decoded(self, im: Image.Image):
+        """Yield (index, rgba, duration_ms) for every frame, in order."""
+        frames = iter(ImageSequence.Iterator(im))
+        i = 0
+        while True:
+            with self._stage("decode"):
+                frame = next(frames, None)
+                if frame is None:
+                    return
+                frame.load()
+            # convert() copies, so the next seek cannot touch this frame
+            with self._stage("convert"):
+                img = frame.convert("RGBA")
+            # info["duration"] is only populated once the frame is loaded
+            yield i, img, int(frame.info.get("duration", 0) or 0)
+            i += 1
+
+    def _held_frames(self, im: Image.Image, settings: dict):
+        """Yield (rgba, duration_ms, source_frames) for every distinct frame.
+
+        With settings["dedupe"], a run of consecutive frames matching its first
+        frame (within dedupe_threshold) becomes one frame held for the summed
+        duration, so static holds are resized, written and encoded once.
+        Frames with and without a duration are never merged, since a missing
+        duration falls back to the fixed frame rate.
+        """
+        if not settings["dedupe"]:
+            for _, img, ms in self._decoded(im):
+                yield img, ms, 1
+            return
+        threshold = settings["dedupe_threshold"]
+        held = None
+        for _, img, ms in self._decoded(im):
+            if held is not None and (ms > 0) == (held[1] > 0):
+                with self._stage("dedupe"):
+                    repeated = frames_match(held[0], img, threshold)
+                if repeated:
+                    held[1] += ms
+                    held[2] += 1
+                    continue
+            if held is not None:
+                yield tuple(held)
+            held = [img, ms, 1]
+        if held is not None:
+            yield tuple(held)
+
+    def _map_frames(self, im: Image.Image, fn, settings: dict):
+        """Yield (fn(rgba, index), duration_ms, source_frames) in order for
+        every frame from _held_frames; index counts the frames yielded.
+
+        Decoding has to stay sequential, so it runs on this thread; fn (resize,
+        letterbox, PNG/raw encode) runs on a thread pool since Pillow releases
+        the GIL there. At most two frames per thread are in flight, so memory
+        stays flat however long the animation is.
+        """
+        threads = frame_threads(settings)
+        if threads <= 1:
+            for i, (img, ms, count) in enumerate(self._held_frames(im, settings)):
+                if self.cancelled():
+                    return
+                yield fn(img, i), ms, count
+            return
+
+        pool = ThreadPoolExecutor(max_workers=threads,
+                                  thread_name_prefix="frame")
+        pending: deque = deque()
+        try:
+            for i, (img, ms, count) in enumerate(self._held_frames(im, settings)):
+                if self.cancelled():
+                    return
+                pending.append((pool.submit(fn, img, i), ms, count))
+                if len(pending) >= 2 * threads:
+                    future, ms, count = pending.popleft()
+                    yield future.result(), ms, count
+            while pending:
+                if self.cancelled():
+                    return
+                future, ms, count = pending.popleft()
+                yield future.result(), ms, count
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def extract_frames(self, webp_file: str, temp_dir: Path, settings: dict,
+                       start_idx: int = 0, target_override: tuple | None = None,
+                       progress=None, fit: bool = True) -> list[tuple[str, int, int]]:
+        """Stream frames to PNG files; fit=False keeps the source size (for
+        an encode with a scale filter).
+        Returns [(path, duration_ms, source_frames), ...]; source_frames > 1
+        for merged repeats (see _held_frames). Raises on decode failure."""
+        frames: list[tuple[str, int, int]] = []
+        with Image.open(webp_file) as im:
+            target = target_override or self.target_size(im.width, im.height,
+                                                          settings)
+            n_frames = getattr(im, "n_frames", None)
+            resample = settings["resample"]
+            plan = (LetterboxPlan(im.size, target, resample)
+                    if target_override else None)
+
+            def save(img, i):
+                path = temp_dir / f"frame_{start_idx + i:06d}.png"
+                if fit:
+                    img = self._timed_fit(img, target, plan, resample)
+                with self._stage("save"):
+                    img.save(path)
+                return str(path)
+
+            done = 0
+            for frame in self._map_frames(im, save, settings):
+                frames.append(frame)
+                done += frame[2]
+                if progress and n_frames:
+                    progress(min(1.0, done / n_frames))
+        return frames
+
+    # ── Encoding ─────────────────────────────
+
+    def _frame_durations_sec(self, frames: list[tuple[str, int, int]],
+                             settings: dict) -> list[float]:
+        fallback = 1.0 / settings["fps"]
+        if settings["source_timing"]:
+            return [(ms / 1000.0) if ms > 0 else fallback * count
+                    for _, ms, count in frames]
+        return [fallback * count for _, _, count in frames]
+
+    def encode(self, frames: list[tuple[str, int, int]], output_path: str,
+               settings: dict, progress=None, vf: str | None = None):
+        try:
+            with self._stage("encode"):
+                if settings["format"] == ".gif":
+                    self._encode_gif(frames, output_path, settings, progress)
+                else:
+                    self._encode_ffmpeg(frames, output_path, settings, progress, vf)
+        except Exception:
+            self._remove_partial(output_path)
+            raise
+        if self.cancelled():
+            self._remove_partial(output_path)
+
+    def stream_encode(self, webp_file: str, output_path: str, settings: dict,
+                      progress=None):
+        """Decode webp_file straight into ffmpeg's stdin (or the GIF writer);
+        no temp frames."""
+        self._stream([webp_file], output_path, settings, progress)
+
+    def stream_combined(self, webp_files: list, output_path: str,
+                        settings: dict, progress=None, on_file=None):
+        """Feed every file, in order, into one ffmpeg as one continuous
+        stream (or one GIF), letterboxed to the first file's target size.
+        Decoding of one
+        file overlaps encoding of the previous ones and nothing is staged on
+        disk. on_file(index) is called as each file starts. Errors name the
+        file they came from."""
+        self._stream(webp_files, output_path, settings, progress,
+                     letterboxed=True, on_file=on_file)
+
+    def _stream(self, webp_files, output_path, settings, progress=None,
+                letterboxed=False, on_file=None):
+        encode = (self._stream_gif if settings["format"] == ".gif"
+                  else self._stream_ffmpeg)
+        try:
+            encode(webp_files, output_path, settings, progress, letterboxed,
+                   on_file)
+        except Exception:
+            self._remove_partial(output_path)
+            raise
+        if self.cancelled():
+            self._remove_partial(output_path)
+
+    def _stream_ffmpeg(self, webp_files, output_path, settings, progress=None,
+                       letterboxed=False, on_file=None):
+        # with ffmpeg_scale, frames go in at source size and ffmpeg fits them
+        native = self._native_size(webp_files, settings)
+        vf = native and self._scale_filter(
+            native, self.target_size(*native, settings), letterboxed, settings)
+        # vfr: keep the per-block timestamps instead of resampling to a guessed
+        # rate; millisecond encoder ticks so WebP durations are not rounded to it
+        cmd = self._ffmpeg_cmd(["-f", "matroska", "-i", "pipe:0", "-nostats",
+                                "-fps_mode", "vfr", "-enc_time_base", "1/1000"],
+                               output_path, settings, vf)
+        fallback_us = round(1_000_000 / settings["fps"])
+        proc = subprocess.Popen(cmd, **self._popen_kwargs(
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL))
+        self.ffmpeg_proc = proc
+        stderr_chunks: list[bytes] = []
+        drain = threading.Thread(
+            target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+        drain.start()
+
+        def write(*chunks) -> bool:
+            try:
+                for chunk in chunks:
+                    proc.stdin.write(chunk)
+                return True
+            except OSError:  # ffmpeg exited or was cancelled; reported below
+                return False
+
+        def send(pts_us, duration_us, data) -> bool:
+            head, tail = mkv_frame_header(pts_us, duration_us, len(data))
+            with self._stage("pipe"):
+                return write(head, data, tail)
+
+        n_files = len(webp_files)
+        target: tuple | None = None
+        plan: LetterboxPlan | None = None   # per file, when letterboxed
+        alive = True
+        pts = 0
+        written = 0
+        pending = None      # (pts, duration, data): held back until the next frame
+        finished = False
+
+        def raw(img, _i):
+            if not native:
+                img = self._timed_fit(img, target, plan, settings["resample"])
+            with self._stage("save"):
+                return img.tobytes()
+
+        try:
+            for idx, webp_file in enumerate(webp_files):
+                if self.cancelled() or not alive:
+                    break
+                if on_file:
+                    on_file(idx)
+                with self._file_errors(webp_file, n_files):
+                    with Image.open(webp_file) as im:
+                        if target is None:
+                            target = self.target_size(im.width, im.height,
+                                                      settings)
+                            alive = write(mkv_stream_header(*(native or target)))
+                        if letterboxed and not native:
+                            plan = LetterboxPlan(im.size, target, settings["resample"])
+                        n_frames = getattr(im, "n_frames", None)
+                        file_frames = 0
+                        encoded = self._map_frames(im, raw, settings)
+                        try:
+                            for data, ms, count in encoded:
+                                if self.cancelled() or not alive:
+                                    break
+                                dur = (ms * 1000
+                                       if settings["source_timing"] and ms > 0
+                                       else fallback_us * count)
+                                if pending:
+                                    alive = send(*pending)
+                                pending = (pts, dur, data)
+                                pts += dur
+                                written += 1
+                                file_frames += count
+                                if progress and n_frames:
+                                    progress(min(0.99, (idx + file_frames / n_frames)
+                                                 / n_files))
+                        finally:
+                            encoded.close()
+                    if not file_frames and alive and not self.cancelled():
+                        raise RuntimeError("no frames decoded")
+            if pending and alive and not self.cancelled():
+                # Matroska and WebM keep the last block's duration, but mp4
+                # ends at the last decode timestamp, which trails x264's
+                # B-frame reordering: there the frame's final milliseconds go
+                # out as separate 1 ms pieces, so it still ends on time
+                start, dur, data = pending
+                pieces = (MP4_END_FRAMES if settings["format"] == ".mp4"
+                          and dur > MP4_END_FRAMES * 1000 else 0)
+                alive = send(start, dur - pieces * 1000, data)
+                for k in range(pieces, 0, -1):
+                    alive = alive and send(start + dur - k * 1000, 1000, data)
+            with self._stage("encode"):  # ffmpeg flushing its queued frames
+                try:
+                    proc.stdin.close()
+                except OSError:
+                    pass
+                proc.wait()
+            finished = True
+        finally:
+            if not finished:
+                proc.kill()
+                proc.wait()
+            self.ffmpeg_proc = None
+        drain.join(timeout=2)
+
+        if self.cancelled():
+            return
+        if not written:
+            raise RuntimeError("no frames decoded")
+        if proc.returncode != 0:
+            err = (stderr_chunks[0] if stderr_chunks else b"")
+            raise RuntimeError(
+                f"ffmpeg failed: {err.decode(errors='ignore')[-400:]}")
+        if progress:
+            progress(1.0)
+
+    def _stream_gif(self, webp_files, output_path, settings, progress=None,
+                    letterboxed=False, on_file=None):
+        """Streamed GIF: one palette sampled across all input frames, then
+        every frame is quantized against it on the frame threads and written
+        as it arrives."""
+        n_files = len(webp_files)
+        with self._file_errors(webp_files[0], n_files):
+            with Image.open(webp_files[0]) as im:
+                target = self.target_size(im.width, im.height, settings)
+        with self._stage("palette"):
+            palette = gif_palette(self._gif_samples(webp_files, target,
+                                                    letterboxed))
+        fallback_ms = 1000 / settings["fps"]
+        written = 0
+        plan: LetterboxPlan | None = None   # per file, when letterboxed
+
+        def quantized(img, _i):
+            img = self._timed_fit(img, target, plan, settings["resample"])
+            with self._stage("quantize"):
+                return rgba_to_gif_frame(img, palette)
+
+        with GifWriter(output_path, delta=settings["gif_delta"]) as gif:
+            for idx, webp_file in enumerate(webp_files):
+                if self.cancelled():
+                    break
+                if on_file:
+                    on_file(idx)
+                with self._file_errors(webp_file, n_files):
+                    with Image.open(webp_file) as im:
+                        if letterboxed:
+                            plan = LetterboxPlan(im.size, target, settings["resample"])
+                        n_frames = getattr(im, "n_frames", None)
+                        file_frames = 0
+                        encoded = self._map_frames(im, quantized, settings)
+                        try:
+                            for frame, ms, count in encoded:
+                                if self.cancelled():
+                                    break
+                                dur = (ms if settings["source_timing"] and ms > 0
+                                       else fallback_ms * count)
+                                with self._stage("encode"):
+                                    gif.add(frame, dur)
+                                written += 1
+                                file_frames += count
+                                if progress and n_frames:
+                                    progress(min(0.99, (idx + file_frames / n_frames)
+                                                 / n_files))
+                        finally:
+                            encoded.close()
+                    if not file_frames and not self.cancelled():
+                        raise RuntimeError("no frames decoded")
+
+        if self.cancelled():
+            return
+        if not written:
+            raise RuntimeError("no frames decoded")
+        if progress:
+            progress(1.0)
+
+    def _gif_samples(self, webp_files, target, letterboxed) -> list:
+        """gif_sample() frames spread evenly over all of webp_files, taken as
+        one sequence. Seeks only go forward, so each file decodes once, and
+        only up to its last sampled frame."""
+        n_files = len(webp_files)
+        counts = []
+        for webp_file in webp_files:
+            with self._file_errors(webp_file, n_files):
+                with Image.open(webp_file) as im:
+                    counts.append(getattr(im, "n_frames", 1))
+        wanted = spread(sum(counts), GIF_PALETTE_SAMPLES)
+        samples = []
+        start = 0
+        for webp_file, count in zip(webp_files, counts):
+            picks = [i - start for i in wanted if start <= i < start + count]
+            start += count
+            if not picks or self.cancelled():
+                continue
+            with self._file_errors(webp_file, n_files):
+                with Image.open(webp_file) as im:
+                    # the bars end up in the GIF too
+                    plan = LetterboxPlan(im.size, target) if letterboxed else None
+                    for i in picks:
+                        im.seek(i)
+                        img = im.convert("RGBA")
+                        if plan:
+                            img = plan.apply(img)
+                        samples.append(gif_sample(img))
+        return samples
+
+    @staticmethod
+    @contextmanager
+    def _file_errors(webp_file: str, n_files: int):
+        """Prefix errors with the file name when several files share one
+        output."""
+        try:
+            yield
+        except Exception as e:
+            if n_files == 1:
+                raise
+            raise RuntimeError(f"{Path(webp_file).name}: {e}") from e
+
+    @staticmethod
+    def _remove_partial(path: str):
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError:
+            pass
+
+    def _encode_gif(self, frames, output_path, settings, progress=None):
+        """Staged GIF: palette from a spread of the temp PNGs, then one frame
+        at a time through GifWriter."""
+        if not frames:
+            raise RuntimeError("no frames to encode")
+        durations = self._frame_durations_sec(frames, settings)
+        samples = []
+        for i in spread(len(frames), GIF_PALETTE_SAMPLES):
+            with Image.open(frames[i][0]) as img:
+                samples.append(gif_sample(img.convert("RGBA")))
+        palette = gif_palette(samples)
+        with GifWriter(output_path, delta=settings["gif_delta"]) as gif:
+            for i, ((path, *_), dur) in enumerate(zip(frames, durations)):
+                if self.cancelled():
+                    return
+                with Image.open(path) as img:
+                    gif.add(rgba_to_gif_frame(img.convert("RGBA"), palette),
+                            dur * 1000)
+                if progress:
+                    progress((i + 1) / len(frames))
+
+    @staticmethod
+    def _ffmpeg_cmd(input_args: list, output_path: str, settings: dict,
+                    vf: str | None = None) -> list:
+        """ffmpeg command line for the video formats, after the given inputs
+        (and an optional -vf filter chain)."""
+        fmt = settings["format"]
+        crf = settings["crf"]
+        profile = SPEED_PROFILES[settings["speed"]]
+        codec = VIDEO_CODECS.get(fmt, "libx264")
+
+        cmd = [ffmpeg_exe(), "-y", *input_args]
+        if vf:
+            cmd += ["-vf", vf]
+        cmd += ["-c:v", codec]
+        if codec == "libvpx-vp9":
+            cmd += ["-crf", str(crf), "-b:v", "0", "-row-mt", "1",
+                    "-deadline", profile["vp9_deadline"],
+                    "-cpu-used", str(profile["vp9_cpu_used"]),
+                    "-pix_fmt", "yuv420p"]
+        else:
+            cmd += ["-crf", str(crf), "-pix_fmt", "yuv420p",
+                    "-preset", profile["x264_preset"]]
+            if profile["x264_tune"]:
+                cmd += ["-tune", profile["x264_tune"]]
+            if fmt == ".mp4":
+                cmd += ["-movflags", "+faststart"]
+        threads = settings.get("encoder_threads") or 0
+        if threads:
+            cmd += ["-threads", str(threads)]
+        cmd.append(output_path)
+        return cmd
+
+    @staticmethod
+    def _popen_kwargs(**kwargs) -> dict:
+        kwargs.setdefault("stderr", subprocess.PIPE)
+        if sys.platform == "win32":
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+        return kwargs
+
+    def _encode_ffmpeg(self, frames, output_path, settings, progress=None, vf=None):
+        durations = self._frame_durations_sec(frames, settings)
+        list_path = os.path.join(os.path.dirname(frames[0][0]), "_framelist.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            last_entry = ""
+            for (frame_path, *_), dur in zip(frames, durations):
+                escaped = frame_path.replace(os.sep, "/").replace("'", "'\\''")
+                last_entry = f"file '{escaped}'\n"
+                f.write(last_entry)
+                f.write(f"duration {dur:.6f}\n")
+            # concat demuxer quirk: repeat last file so its duration is honored
+            f.write(last_entry)
+
+        cmd = self._ffmpeg_cmd(
+            ["-f", "concat", "-safe", "0", "-i", list_path,
+             "-progress", "pipe:1", "-nostats"],
+            output_path, settings, vf)
+        kwargs = self._popen_kwargs(stdout=subprocess.PIPE)
+
+        proc = subprocess.Popen(cmd, **kwargs)
+        self.ffmpeg_proc = proc
+        stderr_chunks: list[bytes] = []
+        drain = threading.Thread(
+            target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+        drain.start()
+        try:
+            total = len(frames)
+            for raw in proc.stdout:
+                line = raw.decode("utf-8", errors="ignore").strip()
+                if progress and total and line.startswith("frame="):
+                    try:
+                        progress(min(1.0, int(line.split("=", 1)[1]) / total))
+                    except ValueError:
+                        pass
+            proc.wait()
+        finally:
+            self.ffmpeg_proc = None
+        drain.join(timeout=2)
+
+        if proc.returncode != 0 and not self.cancelled():
+            err = (stderr_chunks[0] if stderr_chunks else b"")
+            raise RuntimeError(
+                f"ffmpeg failed: {err.decode(errors='ignore')[-400:]}")
+        if progress and not self.cancelled():
+            progress(1.0)
+
+
+# ── Worker pool (one Converter per process) ──
+
+_pool_converter: "Converter | None" = None
+_pool_progress = None
+
+
+class TempBudget:
+    """Byte budget for staged frames shared by the pool's workers.
+
+    A worker reserves a file's staged_bytes() before extracting and gives
+    them back after cleanup; while the budget is full, new extractions wait
+    (backpressure) instead of filling a small tmpfs. A file is always let in
+    when nothing else is staged, so one bigger than the whole budget still
+    runs, alone, rather than waiting forever.
+    """
+
+    def __init__(self, max_bytes: int, ctx=multiprocessing):
+        self.max_bytes = max_bytes
+        self._cond = ctx.Condition()
+        self._used = ctx.RawValue("q", 0)
+        self._active = ctx.RawValue("i", 0)
+
+    def acquire(self, nbytes: int, cancelled=lambda: False) -> bool:
+        """Block until nbytes fit; False if cancelled while waiting."""
+        with self._cond:
+            while (self._active.value
+                   and self._used.value + nbytes > self.max_bytes):
+                if cancelled():
+                    return False
+                self._cond.wait(0.2)
+            self._used.value += nbytes
+            self._active.value += 1
+            return True
+
+    def release(self, nbytes: int):
+        with self._cond:
+            self._used.value -= nbytes
+            self._active.value -= 1
+            self._cond.notify_all()
+
+
+def _pool_init(cancel_event, progress_queue, temp_budget=None):
+    global _pool_converter, _pool_progress
+    _pool_converter = Converter(cancel_event.is_set)
+    _pool_converter.temp_budget = temp_budget
+    _pool_progress = progress_queue
+
+    def watch_cancel():
+        cancel_event.wait()
+        _pool_converter.terminate()
+    threading.Thread(target=watch_cancel, daemon=True).start()
+
+
+def _pool_convert(webp_file: str, output_path: str, settings: dict,
+                  profile_path: str | None = None) -> dict:
+    """Process-pool entry point; progress goes to the queue as (path, fraction).
+    Returns the file's stage timings."""
+    last = [-1]
+
+    def progress(p):
+        pct = int(p * 100)
+        if pct != last[0]:
+            last[0] = pct
+            _pool_progress.put((webp_file, p))
+
+    progress(0.0)
+    with tempfile.TemporaryDirectory(dir=settings["temp_dir"] or None) as tmp:
+        return _pool_converter.convert_file(webp_file, output_path, Path(tmp),
+                                            settings, progress, profile_path)
+
+
+# ─────────────────────────────────────────────
+# Job journal
+# ─────────────────────────────────────────────
+
+class JobJournal:
+    """Append-only record of a batch, so an interrupted one can be resumed.
+
+    JOURNAL_DIR/<job_id>.jsonl holds one JSON object per line: a header with
+    the settings and the full file list, then {"file", "status", "output"}
+    as each file starts ("converting") and ends ("done" or "error"). Every
+    line is flushed and fsynced, so after a crash or power cut all but a torn
+    last line survive (that one is skipped). A batch that runs to the end
+    deletes its journal; a cancelled or crashed one leaves it for resume.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    @classmethod
+    def create(cls, job_id: str, settings: dict, files: list) -> "JobJournal | None":
+        journal = cls(os.path.join(JOURNAL_DIR, f"{job_id}.jsonl"))
+        header = {"job": job_id, "created": time.time(), "files": files,
+                  "settings": {k: v for k, v in settings.items() if k != "files"}}
+        try:
+            os.makedirs(JOURNAL_DIR, exist_ok=True)
+            journal._file = open(journal.path, "x", encoding="utf-8")
+            journal._write(header)
+        except OSError:
+            journal.close()
+            return None
+        return journal
+
+    @classmethod
+    def latest(cls) -> "JobJournal | None":
+        """The newest journal that still has files left to convert.
+
+        Journals with nothing left, or untouched for JOURNAL_MAX_AGE_S, are
+        deleted on the way, so abandoned batches stop being offered."""
+        try:
+            names = [n for n in os.listdir(JOURNAL_DIR) if n.endswith(".jsonl")]
+        except OSError:
+            return None
+        mtimes = {}
+        for name in names:
+            try:
+                mtimes[name] = os.path.getmtime(os.path.join(JOURNAL_DIR, name))
+            except OSError:
+                pass
+        cutoff = time.time() - JOURNAL_MAX_AGE_S
+        found = None
+        for name in sorted(mtimes, key=mtimes.get, reverse=True):
+            journal = cls(os.path.join(JOURNAL_DIR, name))
+            if mtimes[name] < cutoff or not journal.remaining():
+                journal.discard()
+            elif found is None:
+                found = journal
+        return found
+
+    def load(self) -> dict:
+        """{"job", "settings", "files", "states": {file: (status, output)}};
+        empty if the journal is missing or has no readable header."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return {}
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                break                   # torn write: nothing after it is valid
+        if not entries or not isinstance(entries[0].get("files"), list):
+            return {}
+        data = dict(entries[0], states={})
+        for entry in entries[1:]:
+            data["states"][entry.get("file")] = (entry.get("status"), entry.get("output"))
+        return data
+
+    def settings(self) -> dict:
+        """The batch's settings, normalized. The recorded output folder is
+        kept even if it is gone, so validate_settings reports it instead of
+        the batch quietly going to the current directory."""
+        recorded = self.load().get("settings", {})
+        settings = normalize_settings(recorded)
+        if isinstance(recorded.get("output_folder"), str):
+            settings["output_folder"] = recorded["output_folder"]
+        return settings
+
+    def remaining(self) -> list[str]:
+        """Files with no final state yet, in the original batch order."""
+        data = self.load()
+        finished = {f for f, (status, _out) in data.get("states", {}).items()
+                    if status in ("done", "error")}
+        return [f for f in data.get("files", []) if f not in finished]
+
+    def interrupted_outputs(self) -> list[str]:
+        """Outputs of files that started but never finished (partial files)."""
+        return [out for _f, (status, out) in self.load().get("states", {}).items()
+                if status == "converting" and out]
+
+    def _write(self, entry: dict):
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def record(self, path: str, status: str, output: str | None = None):
+        if self._file is None:
+            try:
+                self._file = open(self.path, "a", encoding="utf-8")
+            except OSError:
+                return
+        try:
+            self._write({"file": path, "status": status, "output": output})
+        except OSError:
+            pass
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+# ─────────────────────────────────────────────
+# Watch folders
+# ─────────────────────────────────────────────
+
+WATCH_SETTLE_S = 2.0      # a new file must keep its size and mtime this long
+WATCH_POLL_S = 1.0        # wake-up interval while watching
+WATCH_RESCAN_S = 60.0     # polling: relist even if a folder's mtime looks unchanged
+
+# <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_INOTIFY_EVENT = struct.Struct("iIII")     # wd, mask, cookie, len
+
+
+class _Inotify:
+    """Just enough of Linux inotify through ctypes (no extra dependency)."""
+
+    MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_MOVED_FROM | _IN_DELETE
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        self._ctypes = ctypes
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6",
+                           use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            self._raise("inotify")
+        self.folders: dict[int, str] = {}      # watch descriptor -> folder
+
+    def _raise(self, what: str):
+        err = self._ctypes.get_errno()
+        raise OSError(err, os.strerror(err), what)
+
+    def add(self, folder: str):
+        wd = self._add_watch(self.fd, os.fsencode(folder), self.MASK)
+        if wd < 0:
+            self._raise(folder)
+        self.folders[wd] = folder
+
+    def read(self, timeout: float) -> tuple[list, bool]:
+        """Wait up to timeout for events; returns ([(mask, path)], overflowed)."""
+        events, overflowed = [], False
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return events, overflowed
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return events, overflowed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                overflowed = True
+            elif name and wd in self.folders:
+                events.append((mask, os.path.join(self.folders[wd], os.fsdecode(name))))
+        return events, overflowed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """Reports .webp files that land in folders once they are fully written.
+
+    On Linux inotify names the files that changed. Elsewhere, or with
+    use_inotify=False (network shares do not deliver inotify events), the
+    folders are polled, but a folder is only listed again when its mtime
+    moves or every WATCH_RESCAN_S, so an idle folder costs one stat per poll
+    however many files it holds. Either way a candidate is ready once its
+    size and mtime have held still for `settle` seconds; only pending
+    candidates are stat'ed again. Files already there at start count too.
+    """
+
+    def __init__(self, folders: list, settle: float = WATCH_SETTLE_S,
+                 use_inotify: bool = True):
+        self.folders = [os.path.abspath(f) for f in folders]
+        self.settle = settle
+        self._pending: dict[str, tuple] = {}    # path -> (size, mtime_ns, since)
+        # path -> (size, mtime_ns) handed out; kept while the file is still
+        # there (no --done folder) so it is not converted again
+        self._reported: dict[str, tuple] = {}
+        self._listed: dict[str, int] = {}       # folder -> mtime_ns when last listed
+        self._rescanned = time.monotonic()
+        self._inotify = None
+        if use_inotify and sys.platform.startswith("linux"):
+            inotify = None
+            try:
+                inotify = _Inotify()
+                for folder in self.folders:
+                    inotify.add(folder)
+                self._inotify = inotify
+            except (OSError, AttributeError):
+                if inotify is not None and inotify.fd >= 0:
+                    inotify.close()
+        for folder in self.folders:
+            self._list(folder)
+
+    @property
+    def backend(self) -> str:
+        return "inotify" if self._inotify else "polling"
+
+    def close(self):
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def poll(self, timeout: float = WATCH_POLL_S) -> list[str]:
+        """Wait up to timeout for changes; returns newly settled files."""
+        if self._pending:
+            timeout = min(timeout, self.settle / 2)
+        if self._inotify:
+            events, overflowed = self._inotify.read(timeout)
+            now = time.monotonic()
+            # relisting also drops handed-out files that are gone, should a
+            # delete event have been missed, so _reported stays bounded by
+            # what is actually in the folders
+            if overflowed or now - self._rescanned >= WATCH_RESCAN_S:
+                self._rescanned = now
+                for folder in self.folders:
+                    self._list(folder)
+            for mask, path in events:
+                if not path.lower().endswith(".webp"):
+                    continue
+                if mask & (_IN_DELETE | _IN_MOVED_FROM):
+                    self._forget(path)
+                else:
+                    self._touch(path)
+        else:
+            time.sleep(timeout)
+            now = time.monotonic()
+            full = now - self._rescanned >= WATCH_RESCAN_S
+            if full:
+                self._rescanned = now
+            for folder in self.folders:
+                try:
+                    mtime = os.stat(folder).st_mtime_ns
+                except OSError:
+                    continue
+                if full or mtime != self._listed.get(folder):
+                    self._list(folder)
+        return self._settled()
+
+    def _list(self, folder: str):
+        try:
+            self._listed[folder] = os.stat(folder).st_mtime_ns
+            with os.scandir(folder) as entries:
+                present = {e.path for e in entries
+                           if e.name.lower().endswith(".webp") and e.is_file()}
+        except OSError:
+            return
+        # files moved away may come back under the same name as new work
+        for path in [p for p in self._reported
+                     if os.path.dirname(p) == folder and p not in present]:
+            del self._reported[path]
+        for path in present:
+            self._touch(path)
+
+    def _forget(self, path: str):
+        self._pending.pop(path, None)
+        self._reported.pop(path, None)
+
+    def _touch(self, path: str):
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._forget(path)
+            return
+        key = (st.st_size, st.st_mtime_ns)
+        if self._reported.get(path) == key or self._pending.get(path, ())[:2] == key:
+            return
+        self._pending[path] = (*key, time.monotonic())
+
+    def _settled(self) -> list[str]:
+        now = time.monotonic()
+        ready = []
+        for path, (size, mtime, since) in list(self._pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self._pending[path]
+                continue
+            key = (st.st_size, st.st_mtime_ns)
+            if key != (size, mtime):
+                self._pending[path] = (*key, now)
+            elif size and now - since >= self.settle:
+                del self._pending[path]
+                self._reported[path] = key
+                ready.append(path)
+        return sorted(ready)
+
+
+
+# ─────────────────────────────────────────────
+# Batch engine
+# ─────────────────────────────────────────────
+
+class ConversionEngine:
+    """Runs a whole batch (settings["files"]) without any UI.
+
+    Progress is reported as plain dicts passed to ``on_event``, e.g.
+    ``{"event": "status", "file": path, "status": "done", "output": out}`` or
+    ``{"event": "progress", "fraction": 0.4, "stage": "Converting 2/5"}``.
+    Callbacks arrive on the thread calling run(). cancel() is thread-safe.
+    """
+
+    def __init__(self, on_event=None):
+        self.on_event = on_event or (lambda event: None)
+        self._cancel_requested = False
+        self._converter = Converter(lambda: self._cancel_requested)
+        self._pool_cancel = None
+        self._last_progress = None
+        self._stop_watching = threading.Event()
+        self._outcomes: dict | None = None      # file -> "done" | "error" in watch()
+        self._journal: JobJournal | None = None
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_requested
+
+    def cancel(self):
+        self._cancel_requested = True
+        self._stop_watching.set()
+        self._converter.terminate()
+        pool_cancel = self._pool_cancel
+        if pool_cancel is not None:
+            pool_cancel.set()
+
+    def _emit(self, event: str, **data):
+        data["event"] = event
+        self.on_event(data)
+
+    def _status(self, path: str, status: str, **extra):
+        if self._outcomes is not None and status in ("done", "error"):
+            self._outcomes[path] = status
+        if self._journal is not None and status in ("converting", "done", "error"):
+            self._journal.record(path, status, extra.get("output"))
+        self._emit("status", file=path, status=status, **extra)
+
+    def _progress(self, fraction: float, stage: str = ""):
+        fraction = max(0.0, min(1.0, fraction))
+        key = (int(fraction * 100), stage)
+        if key == self._last_progress:
+            return
+        self._last_progress = key
+        self._emit("progress", fraction=fraction, stage=stage)
+
+    def run(self, settings: dict, journal: "JobJournal | bool" = True) -> dict:
+        """Convert every file in settings["files"].
+
+        Returns {"done": n, "failures": [(name, msg)], "outputs": [...],
+        "cancelled": bool, "cached": n, "timings": [...], "report": path |
+        None}, where timings holds one StageTimer summary per converted output
+        and cached counts outputs taken from the OutputCache (or from an
+        identical source earlier in the batch). With settings["report"] (or
+        "profile") a job report is written to REPORTS_DIR. Raises if combine
+        mode fails, since then there is no output at all.
+
+        Per-file jobs are recorded in a JobJournal (journal=False skips it, a
+        JobJournal from resume() is carried on) that is deleted once the
+        batch runs to the end; combines produce one output and are not
+        journaled.
+        """
+        files = settings["files"]
+        if (settings["stream"] and settings["format"] in VIDEO_CODECS
+                and (ffmpeg_version() or STREAM_MIN_FFMPEG) < STREAM_MIN_FFMPEG):
+            settings = dict(settings, stream=False)
+        result = {"done": 0, "failures": [], "outputs": [], "cancelled": False,
+                  "cached": 0, "timings": [], "report": None}
+        self._last_progress = None
+        # random suffix: runs in the same second and process (GUI re-runs,
+        # watch batches) must not share a journal or report name
+        job_id = (time.strftime("job-%Y%m%d-%H%M%S")
+                  + f"-{os.getpid()}-{os.urandom(3).hex()}")
+        started = time.time()
+        if isinstance(journal, bool):
+            journal = (JobJournal.create(job_id, settings, files)
+                       if journal and not settings["combine"] else None)
+        self._journal = journal
+        completed = False
+        try:
+            with tempfile.TemporaryDirectory(dir=settings["temp_dir"] or None) as tmp:
+                temp_dir = Path(tmp)
+                if settings["combine"]:
+                    settings = dict(settings,
+                                    frame_threads=frame_threads(settings, 1),
+                                    encoder_threads=encoder_threads(settings, 1))
+                    self._combine_job(files, temp_dir, settings, result, job_id)
+                else:
+                    self._files_job(files, temp_dir, settings, result, job_id)
+            result["cancelled"] = self._cancel_requested
+            if settings["report"] or settings["profile"]:
+                result["report"] = self._write_report(job_id, started, settings,
+                                                      result)
+            completed = not result["cancelled"]
+            return result
+        finally:
+            if self._journal is not None:
+                if completed:
+                    self._journal.discard()
+                else:
+                    self._journal.close()
+                self._journal = None
+            self._cancel_requested = False
+
+    def resume(self, journal: JobJournal) -> dict:
+        """Finish an interrupted batch: files that already ended (done or
+        failed) are skipped, partial outputs of the ones cut off are removed
+        so they are written under the same name again, and the rest go
+        through run() with the batch's original settings."""
+        for out in journal.interrupted_outputs():
+            Converter._remove_partial(out)
+        settings = journal.settings()
+        settings["files"] = journal.remaining()
+        return self.run(settings, journal=journal)
+
+    def watch(self, settings: dict, folders: list, done_folder: str | None = None,
+              failed_folder: str | None = None, settle: float = WATCH_SETTLE_S,
+              use_inotify: bool = True) -> dict:
+        """Convert .webp files as they land in folders, until cancel().
+
+        Files that have settled (see FolderWatcher) are converted as one
+        run() batch with these settings; combine is ignored. With
+        done_folder / failed_folder each source is moved there afterwards, so
+        the watched folders only hold outstanding work. Emits
+        {"event": "watching", "folders": [...], "backend": "inotify"} once and
+        {"event": "moved", "file": src, "to": dest} per moved source (with
+        "error" instead of "to" if the move failed). Returns totals
+        {"batches", "done", "failed", "cached"}.
+        """
+        settings = dict(settings, combine=False)
+        totals = {"batches": 0, "done": 0, "failed": 0, "cached": 0}
+        self._stop_watching.clear()
+        with FolderWatcher(folders, settle, use_inotify) as watcher:
+            self._emit("watching", folders=watcher.folders, backend=watcher.backend)
+            while not self._stop_watching.is_set():
+                files = watcher.poll()
+                if not files:
+                    continue
+                self._outcomes = {}
+                try:
+                    result = self.run(dict(settings, files=files), journal=False)
+                finally:
+                    outcomes, self._outcomes = self._outcomes, None
+                totals["batches"] += 1
+                totals["done"] += result["done"]
+                totals["failed"] += len(result["failures"])
+                totals["cached"] += result["cached"]
+                for webp_file, status in outcomes.items():
+                    folder = done_folder if status == "done" else failed_folder
+                    if folder:
+                        self._move_source(webp_file, folder)
+                if result["cancelled"]:
+                    break
+        self._cancel_requested = False      # cancel() may land between batches
+        return totals
+
+    def _move_source(self, webp_file: str, folder: str):
+        try:
+            os.makedirs(folder, exist_ok=True)
+            dest = unique_output_path(folder, Path(webp_file).stem,
+                                      Path(webp_file).suffix)
+            shutil.move(webp_file, dest)
+        except OSError as e:
+            self._emit("moved", file=webp_file, error=str(e))
+        else:
+            self._emit("moved", file=webp_file, to=dest)
+
+    def _combine_job(self, files: list, temp_dir: Path, settings: dict,
+                     result: dict, job_id: str):
+        fmt = settings["format"]
+        cache = self._cache(settings)
+        key = None
+        if cache:
+            digests = self._digests(files)
+            key = cache.key(digests, settings) if digests else None
+            hit = cache.lookup(key, fmt) if key else None
+            if hit:
+                out = unique_output_path(settings["output_folder"], "combined",
+                                         fmt, same_as=hit)
+                if self._reuse(files, hit, out, result):
+                    return
+
+        self._converter.timer = StageTimer()
+        try:
+            run_profiled(self._profile_path(settings, job_id, "combined"),
+                         self._run_combined, files, temp_dir, settings, result)
+        finally:
+            timing = self._converter.timer.summary()
+            self._converter.timer = None
+        if result["outputs"]:
+            result["timings"].append(
+                {"inputs": files, "output": result["outputs"][0], **timing})
+            if key:
+                cache.store(key, fmt, result["outputs"][0])
+
+    def _files_job(self, files: list, temp_dir: Path, settings: dict,
+                   result: dict, job_id: str):
+        """Convert each file to its own output; cache hits and repeats of a
+        source already in the batch are copied instead of re-encoded."""
+        fmt = settings["format"]
+        cache = self._cache(settings)
+        keys: dict[str, str] = {}
+        if cache:
+            for i, webp_file in enumerate(files):
+                if self._cancel_requested:
+                    return
+                self._progress(i / len(files), "Checking cache")
+                digests = self._digests([webp_file])
+                if digests:
+                    keys[webp_file] = cache.key(digests, settings)
+
+        taken: set[str] = set()
+        todo, outputs = [], []
+        repeats = []                    # (file, output, first file with same content)
+        first_with_key: dict[str, str] = {}
+        for webp_file in files:
+            key = keys.get(webp_file)
+            hit = cache.lookup(key, fmt) if key else None
+            out = unique_output_path(settings["output_folder"],
+                                     Path(webp_file).stem, fmt, taken,
+                                     same_as=hit)
+            taken.add(out)
+            if hit and self._reuse([webp_file], hit, out, result):
+                continue
+            if key in first_with_key:
+                repeats.append((webp_file, out, first_with_key[key]))
+                continue
+            if key:
+                first_with_key[key] = webp_file
+            todo.append(webp_file)
+            outputs.append(out)
+
+        if todo:
+            profiles = [self._profile_path(settings, job_id, Path(out).stem)
+                        for out in outputs]
+            workers = min(settings["workers"], len(todo))
+            settings = dict(settings,
+                            frame_threads=frame_threads(settings, workers),
+                            encoder_threads=encoder_threads(settings, workers))
+            if workers > 1:
+                self._convert_parallel(todo, outputs, profiles, settings,
+                                       workers, result)
+            else:
+                self._convert_sequential(todo, outputs, profiles, temp_dir,
+                                         settings, result)
+
+        produced = {t["file"]: t["output"] for t in result["timings"]}
+        if cache:
+            for webp_file, out in produced.items():
+                if webp_file in keys:
+                    cache.store(keys[webp_file], fmt, out)
+        for webp_file, out, first in repeats:
+            if self._cancel_requested:
+                return
+            src = produced.get(first)
+            if src is None or not self._reuse([webp_file], src, out, result):
+                msg = f"same content as {Path(first).name}, which was not converted"
+                self._status(webp_file, "error", error=msg)
+                result["failures"].append((Path(webp_file).name, msg))
+
+    @staticmethod
+    def _cache(settings: dict) -> OutputCache | None:
+        if not settings["cache"] or settings["cache_mb"] <= 0:
+            return None
+        return OutputCache(max_bytes=settings["cache_mb"] * 1024 * 1024)
+
+    @staticmethod
+    def _digests(files: list) -> list | None:
+        """Source hashes, or None if one is unreadable (conversion reports it)."""
+        try:
+            return [OutputCache.source_digest(f) for f in files]
+        except OSError:
+            return None
+
+    def _reuse(self, files: list, src: str, out: str, result: dict) -> bool:
+        """Finish files by copying an existing output to out (unless out is
+        already a copy of it, see unique_output_path)."""
+        try:
+            if not os.path.exists(out):
+                clone_file(src, out)
+        except OSError:
+            return False
+        for f in files:
+            self._status(f, "done", output=out)
+        result["done"] += len(files)
+        result["cached"] += 1
+        result["outputs"].append(out)
+        return True
+
+    @staticmethod
+    def _profile_path(settings: dict, job_id: str, name: str) -> str | None:
+        if not settings["profile"]:
+            return None
+        try:
+            os.makedirs(REPORTS_DIR, exist_ok=True)
+        except OSError:
+            return None
+        return os.path.join(REPORTS_DIR, f"{job_id}_{name}.prof")
+
+    @staticmethod
+    def _write_report(job_id: str, started: float, settings: dict,
+                      result: dict) -> str | None:
+        totals: dict[str, dict] = {}
+        for timing in result["timings"]:
+            for name, stage in timing["stages"].items():
+                total = totals.setdefault(name, {"wall": 0.0, "cpu": 0.0})
+                total["wall"] = round(total["wall"] + stage["wall"], 4)
+                total["cpu"] = round(total["cpu"] + stage["cpu"], 4)
+        report = {
+            "job": job_id,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+            "elapsed": round(time.time() - started, 3),
+            "cancelled": result["cancelled"],
+            "settings": {k: v for k, v in settings.items() if k != "files"},
+            "done": result["done"],
+            "cached": result["cached"],
+            "failures": [{"file": name, "error": msg}
+                         for name, msg in result["failures"]],
+            "totals": totals,
+            "files": result["timings"],
+        }
+        return write_job_report(report, job_id)
+
+    def _run_combined(self, files: list, temp_dir: Path, settings: dict,
+                      result: dict):
+        if settings["stream"]:
+            self._stream_combined(files, settings, result)
+        else:
+            self._stage_combined(files, temp_dir, settings, result)
+
+    def _stream_combined(self, files: list, settings: dict, result: dict):
+        """One encoder for the whole job; files are decoded into it in turn."""
+        n = len(files)
+        out = unique_output_path(settings["output_folder"], "combined",
+                                 settings["format"])
+
+        def on_file(idx):
+            if idx:
+                self._status(files[idx - 1], "done", output=out)
+            self._status(files[idx], "converting")
+
+        try:
+            self._converter.stream_combined(
+                files, out, settings, on_file=on_file,
+                progress=lambda p: self._progress(
+                    p, f"Combining {min(n, int(p * n) + 1)}/{n}"))
+        except Exception:
+            for f in files:
+                self._status(f, "error")
+            raise
+        if self._cancel_requested:
+            return
+        for f in files:
+            self._status(f, "done", output=out)
+        result["done"] = len(files)
+        result["outputs"].append(out)
+
+    def _stage_combined(self, files: list, temp_dir: Path, settings: dict,
+                        result: dict):
+        """Extract every file's frames to PNGs, then encode them all."""
+        converter = self._converter
+        n = len(files)
+        all_frames: list[tuple[str, int, int]] = []
+        target: tuple | None = None
+        try:
+            native = converter._native_size(files, settings)
+        except Exception:
+            for f in files:
+                self._status(f, "error")
+            raise
+        for idx, webp_file in enumerate(files):
+            if self._cancel_requested:
+                return
+            self._status(webp_file, "converting")
+            stage = f"Extracting {idx + 1}/{n}"
+            try:
+                if target is None:
+                    with Image.open(webp_file) as im:
+                        target = converter.target_size(im.width, im.height, settings)
+                frames = converter.extract_frames(
+                    webp_file, temp_dir, settings,
+                    start_idx=len(all_frames),
+                    target_override=target,
+                    progress=lambda p, i=idx: self._progress((i + p) / (n + 1), stage),
+                    fit=not native,
+                )
+                if not frames:
+                    raise RuntimeError("no frames decoded")
+            except Exception as e:
+                for f in files:
+                    self._status(f, "error")
+                raise RuntimeError(f"{Path(webp_file).name}: {e}") from e
+            all_frames.extend(frames)
+
+        if self._cancel_requested:
+            return
+
+        out = unique_output_path(settings["output_folder"], "combined",
+                                 settings["format"])
+        vf = native and converter._scale_filter(native, target, True, settings)
+        converter.encode(all_frames, out, settings,
+                         progress=lambda p: self._progress((n + p) / (n + 1),
+                                                           "Encoding"),
+                         vf=vf)
+        if self._cancel_requested:
+            return
+        for f in files:
+            self._status(f, "done", output=out)
+        result["done"] = len(files)
+        result["outputs"].append(out)
+
+    def _convert_sequential(self, files: list, outputs: list, profiles: list,
+                            temp_dir: Path, settings: dict, result: dict):
+        """Convert files one by one on the calling thread."""
+        n = len(files)
+        for idx, (webp_file, out, prof) in enumerate(zip(files, outputs, profiles)):
+            if self._cancel_requested:
+                return
+            self._status(webp_file, "converting", output=out)
+            try:
+                timing = self._converter.convert_file(
+                    webp_file, out, temp_dir, settings,
+                    progress=lambda p, i=idx: self._progress(
+                        (i + p) / n, f"Converting {i + 1}/{n}"),
+                    profile_path=prof)
+                if self._cancel_requested:
+                    return
+                self._status(webp_file, "done", output=out)
+                result["done"] += 1
+                result["outputs"].append(out)
+                result["timings"].append({"file": webp_file, "output": out,
+                                          **timing})
+            except Exception as e:
+                if self._cancel_requested:
+                    return
+                self._status(webp_file, "error", error=str(e))
+                result["failures"].append((Path(webp_file).name, str(e)))
+
+    def _convert_parallel(self, files: list, outputs: list, profiles: list,
+                          settings: dict, workers: int, result: dict):
+        """Convert files concurrently in a process pool."""
+        ctx = multiprocessing.get_context("spawn")
+        cancel = ctx.Event()
+        progress_queue = ctx.Queue()
+        n = len(files)
+        fractions = dict.fromkeys(files, 0.0)
+        output_of = dict(zip(files, outputs))
+        budget = settings["temp_budget_mb"] * 1024 * 1024
+        temp_budget = (TempBudget(budget, ctx)
+                       if budget and not settings["stream"] else None)
+        started: set[str] = set()
+        finished_count = 0
+
+        def drain_progress():
+            while True:
+                try:
+                    path, fraction = progress_queue.get_nowait()
+                except queue.Empty:
+                    return
+                if path not in started:
+                    started.add(path)
+                    self._status(path, "converting", output=output_of[path])
+                fractions[path] = max(fractions[path], fraction)
+
+        self._pool_cancel = cancel
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                     initializer=_pool_init,
+                                     initargs=(cancel, progress_queue,
+                                               temp_budget)) as pool:
+                futures = {pool.submit(_pool_convert, f, out, settings, prof): (f, out)
+                           for f, out, prof in zip(files, outputs, profiles)}
+                pending = set(futures)
+                while pending:
+                    if self._cancel_requested and not cancel.is_set():
+                        cancel.set()
+                        for fut in pending:
+                            fut.cancel()
+                    finished, pending = wait(pending, timeout=0.1,
+                                             return_when=FIRST_COMPLETED)
+                    drain_progress()
+                    for fut in finished:
+                        path, out = futures[fut]
+                        fractions[path] = 1.0
+                        if fut.cancelled() or self._cancel_requested:
+                            continue
+                        finished_count += 1
+                        exc = fut.exception()
+                        if exc is None:
+                            self._status(path, "done", output=out)
+                            result["done"] += 1
+                            result["outputs"].append(out)
+                            result["timings"].append({"file": path, "output": out,
+                                                      **fut.result()})
+                        else:
+                            self._status(path, "error", error=str(exc))
+                            result["failures"].append((Path(path).name, str(exc)))
+                    self._progress(
+                        sum(fractions.values()) / n,
+                        f"Converting  ·  {finished_count}/{n} finished"
+                        f"  ·  {workers} jobs")
+        finally:
+            self._pool_cancel = None
+
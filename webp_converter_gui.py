@@ -1,16 +1,26 @@
+import time
+_STARTED = time.perf_counter()   # before the heavy imports, for --startup-profile
+
 import os
 import re
 import sys
-import json
 import threading
-import tempfile
 import subprocess
+import multiprocessing
 import tkinter as tk
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
 from tkinter import filedialog, messagebox
 import customtkinter as ctk
-from PIL import Image, ImageDraw, ImageSequence, ImageTk
-import imageio_ffmpeg
+from PIL import Image, ImageSequence, ImageTk
+
+from webp_converter_engine import (
+    DEFAULT_WORKERS, MAX_WORKERS, RESAMPLING, SPEED_PROFILES, VALID_FORMATS,
+    VALID_RESOLUTIONS, ConversionEngine, JobJournal, MetaCache, list_webps, load_settings,
+    ffmpeg_info, make_even, normalize_settings, save_settings, validate_settings,
+    write_job_report,
+)
 
 try:
     from tkinterdnd2 import DND_FILES, TkinterDnD
@@ -19,6 +29,7 @@ except Exception:
     _HAS_DND = False
 
 APP_VERSION = "2.2.0"
+_IMPORTED = time.perf_counter()
 
 # ─────────────────────────────────────────────
 # Helpers
@@ -32,35 +43,10 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
-def _settings_dir():
-    if sys.platform == "win32":
-        base = os.environ.get("APPDATA", os.path.expanduser("~"))
-    elif sys.platform == "darwin":
-        base = os.path.join(os.path.expanduser("~"), "Library", "Application Support")
-    else:
-        base = os.environ.get("XDG_CONFIG_HOME", os.path.join(os.path.expanduser("~"), ".config"))
-    d = os.path.join(base, "WebPConverter")
-    try:
-        os.makedirs(d, exist_ok=True)
-    except OSError:
-        return os.path.abspath(".")
-    return d
-
-
-SETTINGS_FILE = os.path.join(_settings_dir(), "settings.json")
-
-MAX_DIMENSION = 7680
 MAX_PREVIEW_FRAMES = 200
-
-VALID_FORMATS = (".mp4", ".mkv", ".webm", ".gif")
-VALID_RESOLUTIONS = ("Same Resolution", "480p", "720p", "1080p", "4K", "Custom")
-
-RESOLUTION_MAP = {
-    "480p":  (854,  480),
-    "720p":  (1280, 720),
-    "1080p": (1920, 1080),
-    "4K":    (3840, 2160),
-}
+PREVIEW_BATCH_S = 0.1      # how often the preview loader hands frames over
+PREVIEW_WAIT_MS = 15       # playback poll while it waits for the decoder
+PREVIEW_CACHE_MB = 256
 
 # ── Design tokens ──────────────────────────────
 BG          = "#141414"
@@ -90,36 +76,6 @@ FONT_LABEL  = (_FONT_SANS, 12)
 FONT_BTN    = (_FONT_SANS, 13, "bold")
 
 
-def load_settings():
-    if os.path.exists(SETTINGS_FILE):
-        try:
-            with open(SETTINGS_FILE, "r") as f:
-                data = json.load(f)
-                if isinstance(data, dict):
-                    return data
-        except (json.JSONDecodeError, IOError, OSError):
-            pass
-    return {}
-
-
-def save_settings(data):
-    try:
-        with open(SETTINGS_FILE, "w") as f:
-            json.dump(data, f, indent=2)
-    except (IOError, OSError):
-        pass
-
-
-def _num(value, default, lo, hi):
-    if isinstance(value, bool) or not isinstance(value, (int, float)):
-        return default
-    return max(lo, min(hi, int(value)))
-
-
-def make_even(w: int, h: int) -> tuple:
-    return w if w % 2 == 0 else w + 1, h if h % 2 == 0 else h + 1
-
-
 def aspect_fit(img_width, img_height, max_size=380):
     if img_width <= 0 or img_height <= 0:
         return 2, 2
@@ -127,53 +83,99 @@ def aspect_fit(img_width, img_height, max_size=380):
     return make_even(max(2, int(img_width * ratio)), max(2, int(img_height * ratio)))
 
 
-def fit_box(w, h, box_w, box_h):
-    """Largest even size fitting inside box while keeping aspect ratio."""
-    if w <= 0 or h <= 0:
-        return make_even(box_w, box_h)
-    ratio = min(box_w / w, box_h / h)
-    return make_even(max(2, round(w * ratio)), max(2, round(h * ratio)))
-
+@lru_cache(maxsize=8)
+def checkerboard(size: tuple, cell: int = 12) -> Image.Image:
+    """RGBA transparency backdrop for the preview. Cached per size and shared,
+    so callers must not draw on it (composite_on() never does).
+
+    A 2x2 tile (one pixel per cell) is doubled until it covers the grid, then
+    scaled up with NEAREST, instead of drawing every cell.
+    """
+    cols, rows = -(-size[0] // cell), -(-size[1] // cell)
+    grid = Image.new("P", (2, 2))
+    grid.putpalette([0x1c, 0x1c, 0x1c, 0x26, 0x26, 0x26])
+    grid.putdata([0, 1, 1, 0])
+    while grid.width < cols or grid.height < rows:
+        w = grid.width * (2 if grid.width < cols else 1)
+        h = grid.height * (2 if grid.height < rows else 1)
+        doubled = Image.new("P", (w, h))
+        doubled.putpalette(grid.getpalette())
+        for y in range(0, h, grid.height):
+            for x in range(0, w, grid.width):
+                doubled.paste(grid, (x, y))
+        grid = doubled
+    board = grid.crop((0, 0, cols, rows)).resize(
+        (cols * cell, rows * cell), Image.NEAREST)
+    return board.crop((0, 0) + tuple(size)).convert("RGBA")
+
+
+def composite_on(checker: Image.Image, rgba: Image.Image) -> Image.Image:
+    """rgba over the checkerboard. Opaque frames skip blending and fully
+    transparent ones are just the (shared) checkerboard."""
+    lo, hi = rgba.getchannel("A").getextrema()
+    if lo == 255:
+        return rgba.convert("RGB")
+    if hi == 0:
+        return checker
+    return Image.alpha_composite(checker, rgba)
+
+
+class PreviewCache:
+    """Composed preview frames of recently viewed files, so flipping back to a
+    file replays it instantly. Least recently viewed entries are dropped once
+    the estimated size passes max_bytes.
+
+    Keys carry the file's mtime and size plus the fallback delay the frames
+    were built with, so an edited file or a new FPS rebuilds its preview.
+    Only used from the Tk thread.
+    """
+
+    BYTES_PER_PIXEL = 8   # Pillow RGB (4) + the Tk photo made when shown (4)
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()   # key -> (frames, nbytes)
+        self._bytes = 0
 
-def letterbox(img: Image.Image, target: tuple) -> Image.Image:
-    """Aspect-fit img inside target canvas, centered on opaque black."""
-    if img.size == target:
-        return img
-    w, h = fit_box(img.width, img.height, *target)
-    fitted = img.resize((w, h), Image.LANCZOS)
-    canvas = Image.new("RGBA", target, (0, 0, 0, 255))
-    canvas.paste(fitted, ((target[0] - w) // 2, (target[1] - h) // 2), fitted)
-    return canvas
+    @staticmethod
+    def key(path: str, fallback_ms: int) -> tuple | None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (os.path.normcase(path), st.st_mtime_ns, st.st_size, fallback_ms)
 
+    def get(self, key) -> list | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
 
-def unique_output_path(folder: str, stem: str, ext: str) -> str:
-    safe = re.sub(r'[<>:"/\\|?*\x00-\x1f]', "_", stem).strip() or "output"
-    path = os.path.join(folder, f"{safe}{ext}")
-    n = 1
-    while os.path.exists(path):
-        path = os.path.join(folder, f"{safe} ({n}){ext}")
-        n += 1
-    return path
+    def put(self, key, frames: list, size: tuple):
+        nbytes = len(frames) * size[0] * size[1] * self.BYTES_PER_PIXEL
+        if key is None or nbytes > self.max_bytes:
+            return
+        self._pop(key)
+        self._entries[key] = (frames, nbytes)
+        self._bytes += nbytes
+        while self._bytes > self.max_bytes:
+            self._pop(next(iter(self._entries)))
 
+    def drop(self, path: str):
+        """Forget every entry for path (it left the queue)."""
+        path = os.path.normcase(path)
+        for key in [k for k in self._entries if k[0] == path]:
+            self._pop(key)
 
-def checkerboard(size: tuple, cell: int = 12) -> Image.Image:
-    img = Image.new("RGB", size, "#262626")
-    draw = ImageDraw.Draw(img)
-    for y in range(0, size[1], cell):
-        for x in range(0, size[0], cell):
-            if (x // cell + y // cell) % 2 == 0:
-                draw.rectangle([x, y, x + cell - 1, y + cell - 1], fill="#1c1c1c")
-    return img
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
 
-
-def rgba_to_gif_frame(img: Image.Image) -> Image.Image:
-    """Quantize RGBA to palette frame with binary transparency at index 255."""
-    alpha = img.getchannel("A")
-    mask = alpha.point(lambda a: 255 if a <= 128 else 0)
-    frame = img.convert("RGB").convert("P", palette=Image.Palette.ADAPTIVE, colors=255)
-    frame.paste(255, mask)
-    frame.info["transparency"] = 255
-    return frame
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
 
 
 # ─────────────────────────────────────────────
@@ -193,6 +195,245 @@ def section_card(parent, title: str = "", **kwargs) -> ctk.CTkFrame:
     return card
 
 
+class QueueList(ctk.CTkFrame):
+    """Virtualized file queue.
+
+    Only about a screenful of row widgets exists. Scrolling re-points them at
+    other paths instead of creating widgets, so a queue of thousands costs
+    the same as a queue of ten. The app owns the data and mirrors changes to
+    its queue with append(paths), remove(path) and clear(), which edit the
+    row list in place; ``describe(path)`` returns (meta_text, status,
+    selected) for a row being drawn. Call update_row(path) after one file's
+    status, metadata or selection changes, and refresh() when every row's
+    text may have changed. ``on_remove`` gets the row's path.
+    """
+
+    ROW_H = 58          # row pitch in px, gap included
+    STATUS_STYLE = {
+        "converting": ("⟳", AMBER),
+        "done":       ("✓", GREEN),
+        "error":      ("✕", RED),
+    }
+
+    def __init__(self, parent, describe, on_select, on_remove,
+                 empty_text: str, on_empty_click):
+        super().__init__(parent, fg_color="transparent")
+        self._rows: list[str] = []           # paths in queue order
+        self.describe = describe
+        self.on_select = on_select
+        self.on_remove = on_remove
+        self._top = 0.0                      # scroll offset in px
+        self._slots: list[dict] = []
+        self._slot_of: dict[str, dict] = {}  # path -> slot currently showing it
+
+        self._scrollbar = ctk.CTkScrollbar(
+            self, command=self._on_scrollbar,
+            button_color=CARD2, button_hover_color=BORDER,
+        )
+        self._scrollbar.pack(side="right", fill="y")
+        self._viewport = ctk.CTkFrame(self, fg_color="transparent")
+        self._viewport.pack(side="left", fill="both", expand=True, padx=(4, 0))
+        self._viewport.bind("<Configure>", lambda _e: self._layout())
+        self._bind_wheel(self._viewport)
+
+        self._empty = ctk.CTkLabel(
+            self._viewport, text=empty_text,
+            font=FONT_SMALL, text_color=TEXT_MUTED, cursor="hand2",
+        )
+        self._empty.bind("<Button-1>", lambda _e: on_empty_click())
+
+    # ── Public API ──
+
+    def append(self, paths: list):
+        """Add rows for paths at the end of the queue."""
+        self._rows.extend(paths)
+        self._scroll_to(self._top)
+
+    def remove(self, path: str):
+        """Drop path's row; the rows below it move up."""
+        slot = self._slot_of.get(path)
+        try:
+            # rows removed from the UI are nearly always on screen
+            del self._rows[slot["row"] if slot else self._rows.index(path)]
+        except ValueError:
+            return
+        self._scroll_to(self._top)
+
+    def clear(self):
+        self._rows.clear()
+        self._scroll_to(self._top)
+
+    def refresh(self):
+        """Redraw every visible row, e.g. after the metadata format changed."""
+        for slot in self._slots:
+            slot["state"] = None
+        self._scroll_to(self._top)
+
+    def update_row(self, path: str):
+        """Redraw one path's row, if it is on screen."""
+        slot = self._slot_of.get(path)
+        if slot is not None:
+            self._fill(slot)
+
+    def see(self, index: int):
+        """Scroll just enough for row index to be fully visible."""
+        view_h = self._view_h()
+        y = index * self.ROW_H
+        if y < self._top:
+            self._scroll_to(y)
+        elif y + self.ROW_H > self._top + view_h:
+            self._scroll_to(y + self.ROW_H - view_h)
+
+    # ── Rows ──
+
+    def _new_slot(self) -> dict:
+        item = ctk.CTkFrame(
+            self._viewport, fg_color=CARD2, corner_radius=8,
+            border_width=1, border_color=BORDER, height=self.ROW_H - 6,
+        )
+        item.pack_propagate(False)
+        slot = {"frame": item, "path": None, "row": None, "state": None,
+                "hover": False}
+
+        left = ctk.CTkFrame(item, fg_color="transparent")
+        left.pack(side="left", fill="both", expand=True, padx=(10, 0), pady=8)
+        slot["name"] = ctk.CTkLabel(left, text="", font=FONT_HEAD,
+                                    text_color=TEXT, anchor="w")
+        slot["name"].pack(fill="x")
+        slot["meta"] = ctk.CTkLabel(left, text="", font=FONT_MONO,
+                                    text_color=TEXT_DIM, anchor="w")
+        slot["meta"].pack(fill="x")
+
+        # Per-file status indicator
+        slot["status"] = ctk.CTkLabel(
+            item, text="", width=24,
+            font=(_FONT_SANS, 14, "bold"), text_color=TEXT_MUTED,
+        )
+        slot["status"].pack(side="right", padx=(0, 2))
+
+        remove_btn = ctk.CTkButton(
+            item, text="✕", width=28, height=28,
+            fg_color="transparent", hover_color=RED,
+            text_color=TEXT_DIM, font=FONT_BODY,
+            corner_radius=6,
+            command=lambda: self._remove(slot),
+        )
+        remove_btn.pack(side="right", padx=(0, 4), pady=5)
+
+        def on_hover(inside):
+            slot["hover"] = inside
+            if slot["path"] is not None:
+                self._fill(slot)
+
+        def on_click(_e):
+            if slot["path"] is not None:
+                self.on_select(slot["path"])
+
+        for w in (item, left, slot["name"], slot["meta"], remove_btn):
+            w.bind("<Enter>", lambda _e: on_hover(True))
+            w.bind("<Leave>", lambda _e: on_hover(False))
+            if w is not remove_btn:
+                w.bind("<Button-1>", on_click)
+        for w in (item, left, slot["name"], slot["meta"], slot["status"],
+                  remove_btn):
+            self._bind_wheel(w)
+        return slot
+
+    def _remove(self, slot: dict):
+        if slot["path"] is not None:
+            self.on_remove(slot["path"])
+
+    def _fill(self, slot: dict):
+        """Bring a slot's widgets in line with its path; only changed parts
+        are reconfigured, since every CTk configure redraws."""
+        meta, status, selected = self.describe(slot["path"])
+        hover = slot["hover"] and not selected
+        old = slot["state"] or (None, None, None, None)
+        if meta != old[0]:
+            slot["meta"].configure(text=meta)
+        if status != old[1]:
+            glyph, color = self.STATUS_STYLE.get(status, ("", TEXT_MUTED))
+            slot["status"].configure(text=glyph, text_color=color)
+        if selected != old[2]:
+            slot["name"].configure(text_color=ACCENT if selected else TEXT)
+        if (selected, hover) != old[2:]:
+            slot["frame"].configure(
+                fg_color=SELECT_BG if selected else HOVER_BG if hover else CARD2,
+                border_color=ACCENT if selected else BORDER)
+        slot["state"] = (meta, status, selected, hover)
+
+    # ── Scrolling ──
+
+    def _view_h(self) -> float:
+        # place() scales x/y by the widget scaling, so work in unscaled px
+        return max(1.0, self._reverse_widget_scaling(self._viewport.winfo_height()))
+
+    def _layout(self):
+        view_h = self._view_h()
+        needed = int(view_h // self.ROW_H) + 2
+        while len(self._slots) < needed:
+            self._slots.append(self._new_slot())
+        self._scroll_to(self._top)
+
+    def _scroll_to(self, top: float):
+        view_h = self._view_h()
+        content_h = len(self._rows) * self.ROW_H
+        self._top = max(0.0, min(top, content_h - view_h))
+        self._redraw(view_h, content_h)
+
+    def _redraw(self, view_h: float, content_h: int):
+        first = int(self._top // self.ROW_H)
+        self._slot_of = {}
+        for k, slot in enumerate(self._slots):
+            idx = first + k
+            if idx >= len(self._rows):
+                if slot["path"] is not None:
+                    slot["frame"].place_forget()
+                    slot["path"] = slot["row"] = slot["state"] = None
+                    slot["hover"] = False
+                continue
+            path = self._rows[idx]
+            slot["row"] = idx
+            if path != slot["path"]:
+                slot["path"] = path
+                slot["state"] = None
+                slot["name"].configure(text=Path(path).name)
+            self._fill(slot)
+            self._slot_of[path] = slot
+            slot["frame"].place(x=0, y=round(idx * self.ROW_H - self._top),
+                                relwidth=1.0)
+
+        if self._rows:
+            self._empty.place_forget()
+            self._scrollbar.set(self._top / content_h,
+                                min(1.0, (self._top + view_h) / content_h))
+        else:
+            self._empty.place(relx=0.5, y=30, anchor="n")
+            self._scrollbar.set(0.0, 1.0)
+
+    def _on_scrollbar(self, action, value, unit=None):
+        content_h = len(self._rows) * self.ROW_H
+        if action == "moveto":
+            self._scroll_to(float(value) * content_h)
+        elif action == "scroll":
+            step = self.ROW_H if unit == "units" else self._view_h()
+            self._scroll_to(self._top + float(value) * step)
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", self._on_wheel)
+        widget.bind("<Button-5>", self._on_wheel)
+
+    def _on_wheel(self, event):
+        if getattr(event, "num", None) == 4:
+            notches = -1
+        elif getattr(event, "num", None) == 5:
+            notches = 1
+        else:  # Windows sends multiples of 120, macOS small deltas
+            notches = -1 if event.delta > 0 else 1
+        self._scroll_to(self._top + notches * self.ROW_H)
+
+
 # ─────────────────────────────────────────────
 # App
 # ─────────────────────────────────────────────
@@ -206,8 +447,12 @@ else:
 
 
 class WebPConverterApp(_AppBase):
-    def __init__(self):
+    def __init__(self, startup_profile: bool = False):
+        # (stage, perf_counter) marks for --startup-profile
+        self._startup = [("imports", _IMPORTED)]
+        self._startup_profile = startup_profile
         super().__init__()
+        self._mark_startup("window")
 
         ctk.set_appearance_mode("Dark")
         ctk.set_default_color_theme("blue")
@@ -226,22 +471,22 @@ class WebPConverterApp(_AppBase):
         self._set_app_icon()
 
         # State
-        self.webp_files:    list[str] = []
+        # queue order; path -> its normcase key, so removal needs no index
+        self.webp_files:    dict[str, str] = {}
+        self._queued_keys:  set[str] = set()   # normcase paths, for duplicates
         self.selected_file: str | None = None
-        self.file_rows:     dict[str, ctk.CTkFrame] = {}
         self.output_folder  = os.getcwd()
         self._converting    = False
-        self._cancel_requested = False
-        self._ffmpeg_proc   = None
+        self._engine        = ConversionEngine(
+            on_event=lambda event: self._ui(self._on_engine_event, event))
         self._closing       = False
 
         # Per-file conversion status: path -> "" | "converting" | "done" | "error"
         self.file_status:        dict[str, str] = {}
-        self.file_status_labels: dict[str, ctk.CTkLabel] = {}
 
-        # Per-file metadata cache: path -> {size_mb, frames, w, h, total_ms}
+        # Per-file metadata cache: path -> read_meta() dict; persisted on disk
+        self._meta_cache = MetaCache()
         self.file_meta:        dict[str, dict] = {}
-        self.file_meta_labels: dict[str, ctk.CTkLabel] = {}
 
         # Settings vars
         self.output_format     = ctk.StringVar(value=".mp4")
@@ -249,22 +494,43 @@ class WebPConverterApp(_AppBase):
         self.combine_videos    = ctk.BooleanVar(value=False)
         self.use_source_timing = ctk.BooleanVar(value=True)
         self.resolution_preset = ctk.StringVar(value="Same Resolution")
+        self.resample_quality  = ctk.StringVar(value="Balanced")
         self.crf_value         = ctk.IntVar(value=22)
+        self.speed_profile     = ctk.StringVar(value="Balanced")
+        self.stream_frames     = ctk.BooleanVar(value=True)
+        self.workers_value     = ctk.IntVar(value=DEFAULT_WORKERS)
+        self.write_report      = ctk.BooleanVar(value=False)
+        self.dedupe_frames     = ctk.BooleanVar(value=True)
+        self.gif_delta         = ctk.BooleanVar(value=True)
+        self.ffmpeg_scale      = ctk.BooleanVar(value=False)
+        self.use_cache         = ctk.BooleanVar(value=True)
+        self.profile_jobs      = False   # settings.json only: "profile": true
+        self.cache_mb          = 1024    # settings.json only: "cache_mb"
+        self.temp_dir          = ""      # settings.json only: "temp_dir"
+        self.temp_budget_mb    = 0       # settings.json only: "temp_budget_mb"
+        self.dedupe_threshold  = 0       # settings.json only: "dedupe_threshold"
+        self.preview_cache_mb  = PREVIEW_CACHE_MB  # settings.json only
 
         # Preview state
         self.preview_frames:   list = []   # list of (CTkImage, delay_ms)
+        self._preview_cache    = PreviewCache(PREVIEW_CACHE_MB * 1024 * 1024)
         self.preview_index     = 0
         self.preview_running   = False
         self._preview_after_id = None
         self._preview_gen      = 0
+        self._preview_loading  = False   # decoder still adding frames
 
         # Toasts
         self._toasts: list[ctk.CTkFrame] = []
 
         self._build_layout()
+        self._mark_startup("layout")
         self.load_previous_settings()
+        self._mark_startup("settings")
         self.after(100, self._force_left_render)
-        self._setup_dnd()
+        # after(0) runs once mainloop has mapped the window; after_idle then
+        # waits for the first redraw before anything non-essential starts
+        self.after(0, lambda: self.after_idle(self._after_first_paint))
 
         # Keyboard shortcuts
         self.bind("<Control-o>", lambda _e: self.select_webps())
@@ -290,6 +556,36 @@ class WebPConverterApp(_AppBase):
         except Exception:
             pass
 
+    def _mark_startup(self, stage: str):
+        self._startup.append((stage, time.perf_counter()))
+
+    def _after_first_paint(self):
+        self._mark_startup("first paint")
+        # loading the tkdnd Tcl package and probing ffmpeg can both wait
+        # until the window is on screen
+        self._setup_dnd()
+        threading.Thread(target=ffmpeg_info, daemon=True).start()
+        if self._startup_profile:
+            self._report_startup()
+        else:
+            threading.Thread(target=self._find_interrupted_job, daemon=True).start()
+
+    def _report_startup(self):
+        stages, prev = {}, _STARTED
+        for stage, t in self._startup:
+            stages[stage] = round(t - prev, 4)
+            prev = t
+        report = {"version": APP_VERSION, "frozen": bool(getattr(sys, "frozen", False)),
+                  "stages": stages, "total": round(prev - _STARTED, 4)}
+        path = write_job_report(report, time.strftime("startup-%Y%m%d-%H%M%S"))
+        if sys.stderr:   # None in windowed PyInstaller builds
+            for stage, secs in stages.items():
+                print(f"{stage:<12} {secs * 1000:8.1f} ms", file=sys.stderr)
+            print(f"{'total':<12} {report['total'] * 1000:8.1f} ms", file=sys.stderr)
+            if path:
+                print(f"startup report: {path}", file=sys.stderr)
+        self.destroy()
+
     def _setup_dnd(self):
         if not _HAS_DND:
             return
@@ -449,11 +745,30 @@ class WebPConverterApp(_AppBase):
         )
         self._res_hint.pack(fill="x", padx=16, pady=(2, 0))
 
-        # Bottom padding for fmt_card when custom row is hidden
+        ctk.CTkLabel(fmt_card, text="Resize Quality", font=FONT_SMALL,
+                     text_color=TEXT_DIM, anchor="w").pack(fill="x", padx=16, pady=(10, 2))
+
+        self.resample_seg = ctk.CTkSegmentedButton(
+            fmt_card, values=list(RESAMPLING),
+            variable=self.resample_quality,
+            fg_color=CARD2,
+            selected_color=ACCENT, selected_hover_color=ACCENT_DIM,
+            unselected_color=CARD2, unselected_hover_color=HOVER_BG,
+            text_color=TEXT, font=FONT_BODY,
+            corner_radius=8, height=30,
+        )
+        self.resample_seg.pack(fill="x", padx=16)
+
+        ctk.CTkLabel(
+            fmt_card, text="Balanced pre-shrinks big downscales · Best = full Lanczos",
+            font=FONT_SMALL, text_color=TEXT_MUTED, anchor="w",
+        ).pack(fill="x", padx=16, pady=(2, 0))
+
+        # Bottom padding for fmt_card
         self._fmt_card_pad = ctk.CTkFrame(fmt_card, fg_color="transparent", height=14)
         self._fmt_card_pad.pack(fill="x")
 
-        # Custom resolution row (initially hidden)
+        # Custom resolution row (initially hidden; shown under the resolution hint)
         self.custom_res_row = ctk.CTkFrame(fmt_card, fg_color="transparent")
 
         self.custom_res_width = ctk.CTkEntry(
@@ -509,6 +824,25 @@ class WebPConverterApp(_AppBase):
             hint="18 = best quality   ·   30 = smaller file",
         )
 
+        ctk.CTkLabel(enc_card, text="Encoder Speed", font=FONT_LABEL,
+                     text_color=TEXT, anchor="w").pack(fill="x", padx=16, pady=(10, 4))
+
+        self.speed_seg = ctk.CTkSegmentedButton(
+            enc_card, values=list(SPEED_PROFILES),
+            variable=self.speed_profile,
+            fg_color=CARD2,
+            selected_color=ACCENT, selected_hover_color=ACCENT_DIM,
+            unselected_color=CARD2, unselected_hover_color=HOVER_BG,
+            text_color=TEXT, font=FONT_BODY,
+            corner_radius=8, height=30,
+        )
+        self.speed_seg.pack(fill="x", padx=16)
+
+        ctk.CTkLabel(
+            enc_card, text="Fastest for quick previews · Smallest for archiving",
+            font=FONT_SMALL, text_color=TEXT_MUTED,
+        ).pack(anchor="w", padx=16, pady=(2, 0))
+
         self.combine_check = ctk.CTkCheckBox(
             enc_card,
             text="Combine all files into one output",
@@ -520,6 +854,114 @@ class WebPConverterApp(_AppBase):
         )
         self.combine_check.pack(anchor="w", padx=16, pady=(10, 14))
 
+        # ADVANCED card
+        adv_card = section_card(parent, "ADVANCED")
+        adv_card.pack(fill="x", pady=(0, 10))
+
+        self.stream_check = ctk.CTkCheckBox(
+            adv_card,
+            text="Stream frames to encoder",
+            variable=self.stream_frames,
+            text_color=TEXT, font=FONT_BODY,
+            checkmark_color="#000000",
+            fg_color=ACCENT, hover_color=ACCENT_DIM,
+            border_color=BORDER, corner_radius=4,
+        )
+        self.stream_check.pack(anchor="w", padx=16, pady=(12, 0))
+
+        ctk.CTkLabel(
+            adv_card, text="Skips temp PNGs · off = stage frames on disk",
+            font=FONT_SMALL, text_color=TEXT_MUTED,
+        ).pack(anchor="w", padx=16, pady=(0, 0))
+
+        self.workers_slider = self._slider_row(
+            adv_card, label="Parallel Files", suffix="JOBS",
+            var=self.workers_value, from_=1, to=MAX_WORKERS,
+            steps=MAX_WORKERS - 1, attr="workers_label",
+            hint="Files converted at once in separate processes",
+        )
+
+        self.dedupe_check = ctk.CTkCheckBox(
+            adv_card,
+            text="Merge repeated frames",
+            variable=self.dedupe_frames,
+            text_color=TEXT, font=FONT_BODY,
+            checkmark_color="#000000",
+            fg_color=ACCENT, hover_color=ACCENT_DIM,
+            border_color=BORDER, corner_radius=4,
+        )
+        self.dedupe_check.pack(anchor="w", padx=16, pady=(12, 0))
+
+        ctk.CTkLabel(
+            adv_card, text="Static holds become one longer frame · same playback, smaller file",
+            font=FONT_SMALL, text_color=TEXT_MUTED,
+        ).pack(anchor="w", padx=16, pady=(0, 0))
+
+        self.gif_delta_check = ctk.CTkCheckBox(
+            adv_card,
+            text="GIF: store changed regions only",
+            variable=self.gif_delta,
+            text_color=TEXT, font=FONT_BODY,
+            checkmark_color="#000000",
+            fg_color=ACCENT, hover_color=ACCENT_DIM,
+            border_color=BORDER, corner_radius=4,
+        )
+        self.gif_delta_check.pack(anchor="w", padx=16, pady=(12, 0))
+
+        ctk.CTkLabel(
+            adv_card, text="Frames keep only what moved · much smaller GIFs",
+            font=FONT_SMALL, text_color=TEXT_MUTED,
+        ).pack(anchor="w", padx=16, pady=(0, 0))
+
+        self.ffmpeg_scale_check = ctk.CTkCheckBox(
+            adv_card,
+            text="Resize in FFmpeg",
+            variable=self.ffmpeg_scale,
+            text_color=TEXT, font=FONT_BODY,
+            checkmark_color="#000000",
+            fg_color=ACCENT, hover_color=ACCENT_DIM,
+            border_color=BORDER, corner_radius=4,
+        )
+        self.ffmpeg_scale_check.pack(anchor="w", padx=16, pady=(12, 0))
+
+        ctk.CTkLabel(
+            adv_card, text="Multithreaded scale/pad filters · videos only",
+            font=FONT_SMALL, text_color=TEXT_MUTED,
+        ).pack(anchor="w", padx=16, pady=(0, 0))
+
+        self.cache_check = ctk.CTkCheckBox(
+            adv_card,
+            text="Reuse earlier outputs",
+            variable=self.use_cache,
+            text_color=TEXT, font=FONT_BODY,
+            checkmark_color="#000000",
+            fg_color=ACCENT, hover_color=ACCENT_DIM,
+            border_color=BORDER, corner_radius=4,
+        )
+        self.cache_check.pack(anchor="w", padx=16, pady=(12, 0))
+
+        ctk.CTkLabel(
+            adv_card, text="Unchanged files with the same settings are copied, not re-encoded",
+            font=FONT_SMALL, text_color=TEXT_MUTED,
+        ).pack(anchor="w", padx=16, pady=(0, 0))
+
+        self.report_check = ctk.CTkCheckBox(
+            adv_card,
+            text="Write timing report",
+            variable=self.write_report,
+            text_color=TEXT, font=FONT_BODY,
+            checkmark_color="#000000",
+            fg_color=ACCENT, hover_color=ACCENT_DIM,
+            border_color=BORDER, corner_radius=4,
+        )
+        self.report_check.pack(anchor="w", padx=16, pady=(12, 0))
+
+        ctk.CTkLabel(
+            adv_card, text="Time per stage (decode, resize, encode…) saved per job",
+            font=FONT_SMALL, text_color=TEXT_MUTED,
+        ).pack(anchor="w", padx=16, pady=(0, 0))
+        ctk.CTkFrame(adv_card, fg_color="transparent", height=14).pack(fill="x")
+
         # CONVERT card
         conv_card = section_card(parent, "CONVERT")
         conv_card.pack(fill="x", pady=(0, 10))
@@ -551,9 +993,12 @@ class WebPConverterApp(_AppBase):
 
         self._lockable = [
             self.add_files_btn, self.add_folder_btn, self.output_folder_btn,
-            self.format_seg, self.res_menu,
-            self.fps_slider, self.crf_slider,
-            self.timing_check, self.combine_check,
+            self.format_seg, self.res_menu, self.resample_seg,
+            self.fps_slider, self.crf_slider, self.speed_seg, self.workers_slider,
+            self.timing_check, self.combine_check, self.stream_check,
+            self.dedupe_check, self.gif_delta_check, self.ffmpeg_scale_check,
+            self.cache_check,
+            self.report_check,
             self.custom_res_width, self.custom_res_height,
         ]
 
@@ -648,12 +1093,16 @@ class WebPConverterApp(_AppBase):
         )
         self.queue_count_label.pack(side="right")
 
-        self.files_list_frame = ctk.CTkScrollableFrame(
-            list_card, fg_color="transparent",
-            scrollbar_button_color=CARD2,
-            scrollbar_button_hover_color=BORDER,
+        self.queue_list = QueueList(
+            list_card,
+            describe=self._describe_row,
+            on_select=self._on_row_click,
+            on_remove=self.remove_file,
+            empty_text=("Drop .webp files here\nor press Ctrl+O"
+                        if _HAS_DND else "No files in queue\nCtrl+O to add"),
+            on_empty_click=self.select_webps,
         )
-        self.files_list_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        self.queue_list.pack(fill="both", expand=True, padx=10, pady=(0, 10))
 
     # ── Settings persistence ─────────────────
 
@@ -662,9 +1111,24 @@ class WebPConverterApp(_AppBase):
             "fps":           self.fps_value.get(),
             "format":        self.output_format.get(),
             "crf":           self.crf_value.get(),
+            "speed":         self.speed_profile.get(),
             "resolution":    self.resolution_preset.get(),
+            "resample":      self.resample_quality.get(),
             "combine":       bool(self.combine_videos.get()),
             "source_timing": bool(self.use_source_timing.get()),
+            "stream":        bool(self.stream_frames.get()),
+            "workers":       self.workers_value.get(),
+            "report":        bool(self.write_report.get()),
+            "profile":       self.profile_jobs,
+            "dedupe":        bool(self.dedupe_frames.get()),
+            "dedupe_threshold": self.dedupe_threshold,
+            "gif_delta":     bool(self.gif_delta.get()),
+            "ffmpeg_scale":  bool(self.ffmpeg_scale.get()),
+            "cache":         bool(self.use_cache.get()),
+            "cache_mb":      self.cache_mb,
+            "temp_dir":      self.temp_dir,
+            "temp_budget_mb": self.temp_budget_mb,
+            "preview_cache_mb": self.preview_cache_mb,
             "custom_w":      self.custom_res_width.get(),
             "custom_h":      self.custom_res_height.get(),
             "output_folder": self.output_folder,
@@ -672,25 +1136,40 @@ class WebPConverterApp(_AppBase):
         })
 
     def load_previous_settings(self):
-        s = self._settings
-        self.fps_value.set(_num(s.get("fps", 16), 16, 1, 60))
-        fmt = s.get("format", ".mp4")
-        self.output_format.set(fmt if fmt in VALID_FORMATS else ".mp4")
-        self.crf_value.set(_num(s.get("crf", 22), 22, 18, 30))
-        res = s.get("resolution", "Same Resolution")
-        self.resolution_preset.set(res if res in VALID_RESOLUTIONS else "Same Resolution")
-        self.combine_videos.set(bool(s.get("combine", False)))
-        self.use_source_timing.set(bool(s.get("source_timing", True)))
-        folder = s.get("output_folder", os.getcwd())
-        self.output_folder = folder if isinstance(folder, str) and os.path.isdir(folder) else os.getcwd()
+        s = normalize_settings(self._settings)
+        self.fps_value.set(s["fps"])
+        self.output_format.set(s["format"])
+        self.crf_value.set(s["crf"])
+        self.speed_profile.set(s["speed"])
+        self.resolution_preset.set(s["resolution"])
+        self.resample_quality.set(s["resample"])
+        self.combine_videos.set(s["combine"])
+        self.use_source_timing.set(s["source_timing"])
+        self.stream_frames.set(s["stream"])
+        self.workers_value.set(s["workers"])
+        self.write_report.set(s["report"])
+        self.profile_jobs = s["profile"]
+        self.dedupe_frames.set(s["dedupe"])
+        self.dedupe_threshold = s["dedupe_threshold"]
+        mb = self._settings.get("preview_cache_mb", PREVIEW_CACHE_MB)
+        if isinstance(mb, int) and not isinstance(mb, bool):
+            self.preview_cache_mb = max(0, min(mb, 64 * 1024))
+            self._preview_cache.max_bytes = self.preview_cache_mb * 1024 * 1024
+        self.gif_delta.set(s["gif_delta"])
+        self.ffmpeg_scale.set(s["ffmpeg_scale"])
+        self.use_cache.set(s["cache"])
+        self.cache_mb = s["cache_mb"]
+        self.temp_dir = s["temp_dir"]
+        self.temp_budget_mb = s["temp_budget_mb"]
+        self.output_folder = s["output_folder"]
         for key, entry in (("custom_w", self.custom_res_width),
                            ("custom_h", self.custom_res_height)):
-            val = s.get(key, "")
-            if isinstance(val, str) and val.isdigit():
-                entry.insert(0, val)
+            if s[key]:
+                entry.insert(0, str(s[key]))
         self._refresh_output_label()
         self.fps_label.configure(text=f"{self.fps_value.get()} FPS")
         self.crf_label.configure(text=f"{self.crf_value.get()} CRF")
+        self.workers_label.configure(text=f"{self.workers_value.get()} JOBS")
         self.toggle_custom_res_entry(self.resolution_preset.get())
         self._on_timing_toggle()
 
@@ -711,11 +1190,10 @@ class WebPConverterApp(_AppBase):
 
     def toggle_custom_res_entry(self, choice):
         if choice == "Custom":
-            self._fmt_card_pad.pack_forget()
-            self.custom_res_row.pack(fill="x", padx=16, pady=(10, 14))
+            self.custom_res_row.pack(fill="x", padx=16, pady=(8, 0),
+                                     after=self._res_hint)
         else:
             self.custom_res_row.pack_forget()
-            self._fmt_card_pad.pack(fill="x")
 
     def _set_controls_enabled(self, enabled: bool):
         state = "normal" if enabled else "disabled"
@@ -771,36 +1249,34 @@ class WebPConverterApp(_AppBase):
         folder = filedialog.askdirectory(title="Add all WebP files from folder")
         if not folder:
             return
-        found = sorted(
-            str(p) for p in Path(folder).iterdir()
-            if p.is_file() and p.suffix.lower() == ".webp"
-        )
+        found = list_webps(folder)
         if found:
             self._add_files(found)
         else:
             self.show_toast("No .webp files in that folder", kind="warn")
 
     def _add_files(self, files):
-        existing = {os.path.normcase(f) for f in self.webp_files}
         added, skipped = [], 0
         for f in files:
             f = os.path.abspath(f)
             key = os.path.normcase(f)
-            if key in existing:
+            if key in self._queued_keys:
                 skipped += 1
             elif f.lower().endswith(".webp") and os.path.isfile(f):
                 added.append(f)
-                existing.add(key)
+                self.webp_files[f] = key
+                self._queued_keys.add(key)
             else:
                 skipped += 1
         if not added:
             if skipped:
                 self.show_toast("Nothing added — duplicates or not .webp", kind="warn")
             return
-        self.webp_files.extend(added)
-        self.update_files_list()
+        self.queue_list.append(added)
+        self._update_queue_count()
         self._build_metas_async(added)
         self.set_selected_file(added[0])
+        self.queue_list.see(len(self.webp_files) - len(added))
         self.show_preview(added[0])
         if skipped:
             self.show_toast(f"Added {len(added)}, skipped {skipped}", kind="info")
@@ -816,9 +1292,7 @@ class WebPConverterApp(_AppBase):
         paths = []
         for p in raw:
             if os.path.isdir(p):
-                paths.extend(sorted(
-                    str(x) for x in Path(p).iterdir()
-                    if x.is_file() and x.suffix.lower() == ".webp"))
+                paths.extend(list_webps(p))
             else:
                 paths.append(p)
         self._add_files(paths)
@@ -834,42 +1308,21 @@ class WebPConverterApp(_AppBase):
 
     def _build_metas_async(self, paths: list):
         def work():
-            for path in paths:
-                if self._closing:
-                    return
-                meta = self._read_meta(path)
-                self._ui(self._apply_meta, path, meta)
+            try:
+                for path in paths:
+                    if self._closing:
+                        return
+                    meta = self._meta_cache.get(path)
+                    self._ui(self._apply_meta, path, meta)
+            finally:
+                self._meta_cache.save()
         threading.Thread(target=work, daemon=True).start()
 
-    @staticmethod
-    def _read_meta(path: str) -> dict:
-        meta = {"size_mb": 0.0, "frames": 0, "w": 0, "h": 0, "total_ms": 0}
-        try:
-            meta["size_mb"] = os.path.getsize(path) / (1024 * 1024)
-        except OSError:
-            pass
-        try:
-            with Image.open(path) as im:
-                meta["w"], meta["h"] = im.width, im.height
-                n = getattr(im, "n_frames", 1)
-                total = 0
-                for i in range(n):
-                    im.seek(i)
-                    im.load()  # duration only populated after load
-                    total += int(im.info.get("duration", 0) or 0)
-                meta["frames"] = n
-                meta["total_ms"] = total
-        except Exception:
-            pass
-        return meta
-
     def _apply_meta(self, path: str, meta: dict):
         if path not in self.webp_files:
             return
         self.file_meta[path] = meta
-        label = self.file_meta_labels.get(path)
-        if label and label.winfo_exists():
-            label.configure(text=self._format_meta(path))
+        self.queue_list.update_row(path)
 
     def _format_meta(self, path: str) -> str:
         meta = self.file_meta.get(path)
@@ -886,153 +1339,52 @@ class WebPConverterApp(_AppBase):
                 f"  ·  {meta['frames']} frames  ·  {duration:.1f}s")
 
     def _refresh_meta_labels(self):
-        for path, label in self.file_meta_labels.items():
-            if label.winfo_exists():
-                label.configure(text=self._format_meta(path))
+        self.queue_list.refresh()
 
     # ── File list UI ─────────────────────────
 
-    def update_files_list(self):
-        for widget in self.files_list_frame.winfo_children():
-            widget.destroy()
-        self.file_rows = {}
-        self.file_status_labels = {}
-        self.file_meta_labels = {}
-
+    def _update_queue_count(self):
         count = len(self.webp_files)
         self.queue_count_label.configure(
             text=f"{count} file{'s' if count != 1 else ''}" if count else "")
 
-        if not self.webp_files:
-            hint = ("Drop .webp files here\nor press Ctrl+O"
-                    if _HAS_DND else "No files in queue\nCtrl+O to add")
-            empty = ctk.CTkLabel(
-                self.files_list_frame,
-                text=hint,
-                font=FONT_SMALL, text_color=TEXT_MUTED,
-                cursor="hand2",
-            )
-            empty.pack(pady=30)
-            empty.bind("<Button-1>", lambda _e: self.select_webps())
-            return
+    def _describe_row(self, path: str) -> tuple:
+        return (self._format_meta(path), self.file_status.get(path, ""),
+                path == self.selected_file)
 
-        for idx, file in enumerate(self.webp_files):
-            is_selected = file == self.selected_file
-            bg = SELECT_BG if is_selected else CARD2
-            border = ACCENT if is_selected else BORDER
-
-            item = ctk.CTkFrame(
-                self.files_list_frame, fg_color=bg, corner_radius=8,
-                border_width=1, border_color=border,
-            )
-            item.pack(fill="x", padx=4, pady=3)
-            self.file_rows[file] = item
-
-            def on_enter(e, row=item, path=file):
-                if path != self.selected_file:
-                    row.configure(fg_color=HOVER_BG)
-
-            def on_leave(e, row=item, path=file):
-                if path != self.selected_file:
-                    row.configure(fg_color=CARD2)
-
-            def on_click(e, path=file):
-                self.show_preview(path)
-                self.set_selected_file(path)
-
-            left = ctk.CTkFrame(item, fg_color="transparent")
-            left.pack(side="left", fill="both", expand=True, padx=(10, 0), pady=8)
-
-            ctk.CTkLabel(
-                left, text=Path(file).name,
-                font=FONT_HEAD,
-                text_color=ACCENT if is_selected else TEXT,
-                anchor="w",
-            ).pack(fill="x")
-
-            meta_lbl = ctk.CTkLabel(
-                left, text=self._format_meta(file),
-                font=FONT_MONO, text_color=TEXT_DIM, anchor="w",
-            )
-            meta_lbl.pack(fill="x")
-            self.file_meta_labels[file] = meta_lbl
-
-            # Per-file status indicator
-            status_lbl = ctk.CTkLabel(
-                item, text="", width=24,
-                font=(_FONT_SANS, 14, "bold"), text_color=TEXT_MUTED,
-            )
-            status_lbl.pack(side="right", padx=(0, 2))
-            self.file_status_labels[file] = status_lbl
-
-            status = self.file_status.get(file, "")
-            if status:
-                self._apply_status_style(status_lbl, status)
-
-            remove_btn = ctk.CTkButton(
-                item, text="✕", width=28, height=28,
-                fg_color="transparent", hover_color=RED,
-                text_color=TEXT_DIM, font=FONT_BODY,
-                corner_radius=6,
-                command=lambda i=idx: self.remove_file(i),
-            )
-            remove_btn.pack(side="right", padx=(0, 4), pady=5)
-
-            for w in (item, left):
-                w.bind("<Enter>", on_enter)
-                w.bind("<Leave>", on_leave)
-                w.bind("<Button-1>", on_click)
-            for child in left.winfo_children():
-                child.bind("<Enter>", on_enter)
-                child.bind("<Leave>", on_leave)
-                child.bind("<Button-1>", on_click)
-            remove_btn.bind("<Enter>", on_enter)
-            remove_btn.bind("<Leave>", on_leave)
-
-    def _apply_status_style(self, label: ctk.CTkLabel, status: str):
-        if status == "converting":
-            label.configure(text="⟳", text_color=AMBER)
-        elif status == "done":
-            label.configure(text="✓", text_color=GREEN)
-        elif status == "error":
-            label.configure(text="✕", text_color=RED)
-        else:
-            label.configure(text="", text_color=TEXT_MUTED)
+    def _on_row_click(self, path: str):
+        self.show_preview(path)
+        self.set_selected_file(path)
 
     def _update_file_status(self, path: str, status: str):
         self.file_status[path] = status
-        label = self.file_status_labels.get(path)
-        if label and label.winfo_exists():
-            self._apply_status_style(label, status)
+        self.queue_list.update_row(path)
 
     def set_selected_file(self, path: str):
-        if self.selected_file and self.selected_file in self.file_rows:
-            row = self.file_rows[self.selected_file]
-            if row.winfo_exists():
-                row.configure(fg_color=CARD2, border_color=BORDER)
-        self.selected_file = path
-        if path in self.file_rows:
-            row = self.file_rows[path]
-            if row.winfo_exists():
-                row.configure(fg_color=SELECT_BG, border_color=ACCENT)
+        previous, self.selected_file = self.selected_file, path
+        if previous:
+            self.queue_list.update_row(previous)
+        if path:
+            self.queue_list.update_row(path)
 
     def _remove_selected(self):
         if self._converting or not self.selected_file:
             return
-        if self.selected_file in self.webp_files:
-            idx = self.webp_files.index(self.selected_file)
-            self.remove_file(idx)
+        self.remove_file(self.selected_file)
 
-    def remove_file(self, index: int):
+    def remove_file(self, path: str):
         if self._converting:
             return
-        if 0 <= index < len(self.webp_files):
-            removed = self.webp_files.pop(index)
-            self.file_status.pop(removed, None)
-            self.file_meta.pop(removed, None)
-            if self.selected_file == removed:
-                self.selected_file = self.webp_files[0] if self.webp_files else None
-            self.update_files_list()
+        key = self.webp_files.pop(path, None)
+        if key is not None:
+            self._queued_keys.discard(key)
+            self.file_status.pop(path, None)
+            self.file_meta.pop(path, None)
+            self._preview_cache.drop(path)
+            if self.selected_file == path:
+                self.selected_file = next(iter(self.webp_files), None)
+            self.queue_list.remove(path)
+            self._update_queue_count()
             if self.selected_file:
                 self.show_preview(self.selected_file)
             else:
@@ -1042,15 +1394,20 @@ class WebPConverterApp(_AppBase):
         if self._converting:
             return
         self.webp_files.clear()
+        self._queued_keys.clear()
         self.selected_file = None
         self.file_status.clear()
         self.file_meta.clear()
-        self.update_files_list()
+        self._preview_cache.clear()
+        self.queue_list.clear()
+        self._update_queue_count()
         self._clear_preview()
 
     def _clear_preview(self):
         self._stop_preview()
         self._detach_preview_image()
+        self._preview_gen += 1   # stops a preview still decoding
+        self._preview_loading = False
         self.preview_frames = []
         self.preview_label.configure(image=None, text="Select a file to preview",
                                      cursor="arrow")
@@ -1074,13 +1431,16 @@ class WebPConverterApp(_AppBase):
         if not os.path.isdir(self.output_folder):
             self.show_toast("Output folder no longer exists", kind="err")
             return
+        self._open_folder(self.output_folder)
+
+    def _open_folder(self, folder: str):
         try:
             if sys.platform == "win32":
-                os.startfile(self.output_folder)
+                os.startfile(folder)
             elif sys.platform == "darwin":
-                subprocess.Popen(["open", self.output_folder])
+                subprocess.Popen(["open", folder])
             else:
-                subprocess.Popen(["xdg-open", self.output_folder])
+                subprocess.Popen(["xdg-open", folder])
         except OSError as e:
             self.show_toast(f"Could not open folder: {e}", kind="err")
 
@@ -1092,49 +1452,91 @@ class WebPConverterApp(_AppBase):
         gen = self._preview_gen
         self._detach_preview_image()
         self.preview_frames = []
-        self.preview_label.configure(image=None, text="Loading preview…")
         self.preview_info.configure(text="")
+        fallback_ms = int(1000 / max(1, self.fps_value.get()))
+        key = self._preview_cache.key(filepath, fallback_ms)
+        frames = self._preview_cache.get(key)
+        if frames is not None:
+            self._preview_loading = False
+            self._extend_preview(gen, frames)
+            return
+        self._preview_loading = True
+        # header says no alpha: skip RGBA conversion and the checkerboard
+        opaque = self.file_meta.get(filepath, {}).get("alpha") is False
+        self.preview_label.configure(image=None, text="Loading preview…")
         threading.Thread(
-            target=self._load_preview_frames, args=(filepath, gen), daemon=True
+            target=self._load_preview_frames,
+            args=(filepath, gen, fallback_ms, key, opaque), daemon=True,
         ).start()
 
-    def _load_preview_frames(self, filepath: str, gen: int):
+    def _load_preview_frames(self, filepath: str, gen: int, fallback_ms: int,
+                             key: tuple | None, opaque: bool = False):
+        """Decode on a worker thread, handing frames to the UI as they are
+        ready: the first one at once, then batches every PREVIEW_BATCH_S, so
+        playback starts long before the last frame is decoded. With opaque
+        (known from the header) frames skip the RGBA path entirely."""
         try:
             frames = []
+            sent = 0
+            last_post = time.monotonic()
             with Image.open(filepath) as im:
                 w, h = aspect_fit(im.width, im.height, 380)
                 checker = checkerboard((w, h))
-                fallback_ms = int(1000 / max(1, self.fps_value.get()))
                 for i, frame_img in enumerate(ImageSequence.Iterator(im)):
                     if gen != self._preview_gen or self._closing:
                         return
                     if i >= MAX_PREVIEW_FRAMES:
                         break
-                    rgba = frame_img.convert("RGBA").resize((w, h), Image.LANCZOS)
+                    if opaque:
+                        composed = frame_img.convert("RGB").resize((w, h), Image.LANCZOS)
+                    else:
+                        rgba = frame_img.convert("RGBA").resize((w, h), Image.LANCZOS)
+                        composed = composite_on(checker, rgba)
                     # info["duration"] is only populated once the frame is loaded
                     delay = int(frame_img.info.get("duration", 0) or 0) or fallback_ms
-                    composed = checker.copy()
-                    composed.paste(rgba, (0, 0), rgba)
                     frames.append(
                         (ctk.CTkImage(light_image=composed, size=(w, h)),
                          max(20, delay)))
-            self._ui(self._start_preview, frames, gen)
+                    now = time.monotonic()
+                    if not sent or now - last_post >= PREVIEW_BATCH_S:
+                        self._ui(self._extend_preview, gen, frames[sent:])
+                        sent, last_post = len(frames), now
+            self._ui(self._extend_preview, gen, frames[sent:])
+            self._ui(self._finish_preview, gen, key, frames, (w, h))
         except Exception as e:
-            self._ui(self.preview_label.configure,
-                     image=None, text=f"Preview error: {e}")
+            self._ui(self._preview_failed, gen, e)
 
-    def _start_preview(self, frames: list, gen: int):
-        if gen != self._preview_gen:
+    def _extend_preview(self, gen: int, frames: list):
+        if gen != self._preview_gen or not frames:
             return
-        self.preview_frames = frames
-        self.preview_index  = 0
-        if frames:
+        starting = not self.preview_frames
+        self.preview_frames.extend(frames)
+        if starting:
+            self.preview_index = 0
             img = frames[0][0]
             self.preview_label.configure(image=img, text="", cursor="hand2")
             self.preview_label.image = img
             self.preview_running = True
-            self._update_preview_info()
             self._animate_preview()
+        self._update_preview_info()
+
+    def _finish_preview(self, gen: int, key, frames: list, size: tuple):
+        # cached even if the user has moved on: the work is already done
+        if frames:
+            self._preview_cache.put(key, frames, size)
+        if gen == self._preview_gen:
+            self._preview_loading = False
+            self._update_preview_info()
+
+    def _preview_failed(self, gen: int, error: Exception):
+        if gen != self._preview_gen:
+            return
+        self._stop_preview()
+        self._detach_preview_image()
+        self._preview_loading = False
+        self.preview_frames = []
+        self.preview_label.configure(image=None, text=f"Preview error: {error}")
+        self._update_preview_info()
 
     def _update_preview_info(self):
         n = len(self.preview_frames)
@@ -1143,7 +1545,12 @@ class WebPConverterApp(_AppBase):
             return
         total = sum(d for _, d in self.preview_frames) / 1000
         state = "▶ playing" if self.preview_running else "▮▮ paused"
-        suffix = f"  (first {MAX_PREVIEW_FRAMES})" if n >= MAX_PREVIEW_FRAMES else ""
+        if self._preview_loading:
+            suffix = "  (loading…)"
+        elif n >= MAX_PREVIEW_FRAMES:
+            suffix = f"  (first {MAX_PREVIEW_FRAMES})"
+        else:
+            suffix = ""
         self.preview_info.configure(
             text=f"{n} frames{suffix}  ·  {total:.1f}s  ·  {state} — click image or Space")
 
@@ -1165,10 +1572,17 @@ class WebPConverterApp(_AppBase):
     def _animate_preview(self):
         if not self.preview_frames or not self.preview_running:
             return
+        if self.preview_index >= len(self.preview_frames):
+            if self._preview_loading:
+                # caught up with the decoder: wait for the next frame
+                self._preview_after_id = self.after(PREVIEW_WAIT_MS,
+                                                    self._animate_preview)
+                return
+            self.preview_index = 0
         img, delay = self.preview_frames[self.preview_index]
         self.preview_label.configure(image=img, text="")
         self.preview_label.image = img
-        self.preview_index = (self.preview_index + 1) % len(self.preview_frames)
+        self.preview_index += 1
         self._preview_after_id = self.after(delay, self._animate_preview)
 
     def _stop_preview(self):
@@ -1181,26 +1595,13 @@ class WebPConverterApp(_AppBase):
 
     def _request_cancel(self):
         if self._converting:
-            self._cancel_requested = True
-            proc = self._ffmpeg_proc
-            if proc:
-                try:
-                    proc.terminate()
-                except OSError:
-                    pass
+            self._engine.cancel()
             self._ui(self.progress_text.configure, text="Cancelling…")
             self._ui(self.convert_btn.configure, state="disabled",
                      text="⏹   CANCELLING…")
 
     def _validated_settings(self):
         """Build settings dict for the worker; returns None if invalid."""
-        if not os.path.isdir(self.output_folder):
-            self.show_toast("Output folder does not exist — choose another", kind="err")
-            return None
-        if not os.access(self.output_folder, os.W_OK):
-            self.show_toast("Output folder is not writable", kind="err")
-            return None
-
         custom_w = custom_h = 0
         if self.resolution_preset.get() == "Custom":
             w_str = self.custom_res_width.get().strip()
@@ -1210,22 +1611,39 @@ class WebPConverterApp(_AppBase):
                                 kind="err")
                 return None
             custom_w, custom_h = int(w_str), int(h_str)
-            if not (2 <= custom_w <= MAX_DIMENSION and 2 <= custom_h <= MAX_DIMENSION):
-                self.show_toast(f"Custom size must be 2–{MAX_DIMENSION} px", kind="err")
-                return None
 
-        return {
+        settings = {
             "fps":           max(1, self.fps_value.get()),
             "format":        self.output_format.get(),
             "crf":           self.crf_value.get(),
+            "speed":         self.speed_profile.get(),
             "combine":       self.combine_videos.get(),
             "source_timing": self.use_source_timing.get(),
+            "stream":        self.stream_frames.get(),
+            "workers":       max(1, self.workers_value.get()),
+            "report":        self.write_report.get(),
+            "profile":       self.profile_jobs,
+            "dedupe":        self.dedupe_frames.get(),
+            "dedupe_threshold": self.dedupe_threshold,
+            "gif_delta":     self.gif_delta.get(),
+            "ffmpeg_scale":  self.ffmpeg_scale.get(),
+            "cache":         self.use_cache.get(),
+            "cache_mb":      self.cache_mb,
+            "temp_dir":      self.temp_dir,
+            "temp_budget_mb": self.temp_budget_mb,
             "resolution":    self.resolution_preset.get(),
+            "resample":      self.resample_quality.get(),
             "custom_w":      custom_w,
             "custom_h":      custom_h,
             "output_folder": self.output_folder,
             "files":         list(self.webp_files),
         }
+        try:
+            validate_settings(settings)
+        except ValueError as e:
+            self.show_toast(str(e), kind="err")
+            return None
+        return settings
 
     def start_conversion(self):
         if self._converting:
@@ -1238,13 +1656,45 @@ class WebPConverterApp(_AppBase):
         if settings is None:
             return
 
-        self._converting = True
-        self._cancel_requested = False
-
         self.file_status.clear()
         for path in self.webp_files:
             self._update_file_status(path, "")
+        self._begin_conversion(settings)
 
+    def _find_interrupted_job(self):
+        journal = JobJournal.latest()
+        if journal is None:
+            return
+        left, total = len(journal.remaining()), len(journal.load().get("files", []))
+        self._ui(self.show_toast,
+                 f"Last batch was interrupted — {left} of {total} files left. "
+                 "Click to resume", "warn", 12000,
+                 lambda: self.resume_conversion(journal), journal.discard)
+
+    def resume_conversion(self, journal: JobJournal):
+        """Re-queue an interrupted batch and convert only what is left."""
+        if self._converting:
+            self.show_toast("Conversion already running", kind="warn")
+            return
+        data = journal.load()
+        settings = journal.settings()
+        settings["files"] = data.get("files", [])
+        try:
+            validate_settings(settings)
+        except ValueError as e:
+            self.show_toast(str(e), kind="err")
+            return
+        new = [f for f in settings["files"]
+               if f not in self.webp_files and os.path.isfile(f)]
+        if new:
+            self._add_files(new)
+        for path, (status, _out) in data["states"].items():
+            if path in self.webp_files and status in ("done", "error"):
+                self._update_file_status(path, status)
+        self._begin_conversion(settings, journal)
+
+    def _begin_conversion(self, settings: dict, journal: JobJournal | None = None):
+        self._converting = True
         self.convert_btn.configure(
             text="⏹   CANCEL  (Esc)", command=self._request_cancel,
             fg_color=RED, hover_color="#e74c3c",
@@ -1256,150 +1706,65 @@ class WebPConverterApp(_AppBase):
         self._set_controls_enabled(False)
         self.save_current_settings()
 
-        threading.Thread(target=self._run_conversion, args=(settings,),
+        threading.Thread(target=self._run_conversion, args=(settings, journal),
                          daemon=True).start()
 
-    def _target_size(self, src_w: int, src_h: int, settings: dict) -> tuple:
-        preset = settings["resolution"]
-        if preset == "Custom":
-            return make_even(settings["custom_w"], settings["custom_h"])
-        if preset in RESOLUTION_MAP:
-            return fit_box(src_w, src_h, *RESOLUTION_MAP[preset])
-        return make_even(src_w, src_h)
-
-    def _run_conversion(self, settings: dict):
-        files         = settings["files"]
-        combine       = settings["combine"]
-        output_folder = settings["output_folder"]
-        fmt           = settings["format"]
-        failures: list[tuple[str, str]] = []
-        done_count = 0
-
-        with tempfile.TemporaryDirectory() as tmp:
-            temp_dir = Path(tmp)
-            try:
-                if combine:
-                    n = len(files)
-                    all_frames: list[tuple[str, int]] = []
-                    target: tuple | None = None
-                    for idx, webp_file in enumerate(files):
-                        if self._cancel_requested:
-                            self._finish_cancelled()
-                            return
-                        self._ui(self._update_file_status, webp_file, "converting")
-                        stage = f"Extracting {idx + 1}/{n}"
-                        try:
-                            if target is None:
-                                with Image.open(webp_file) as im:
-                                    target = self._target_size(im.width, im.height,
-                                                               settings)
-                            frames = self._extract_frames(
-                                webp_file, temp_dir, settings,
-                                start_idx=len(all_frames),
-                                target_override=target,
-                                progress=lambda p, i=idx: self._ui_progress(
-                                    (i + p) / (n + 1), stage),
-                            )
-                            if not frames:
-                                raise RuntimeError("no frames decoded")
-                        except Exception as e:
-                            for f in files:
-                                self._ui(self._update_file_status, f, "error")
-                            raise RuntimeError(
-                                f"{Path(webp_file).name}: {e}") from e
-                        all_frames.extend(frames)
-
-                    if self._cancel_requested:
-                        self._finish_cancelled()
-                        return
-
-                    out = unique_output_path(output_folder, "combined", fmt)
-                    self._encode(all_frames, out, settings,
-                                 progress=lambda p: self._ui_progress(
-                                     (n + p) / (n + 1), "Encoding"))
-                    if self._cancel_requested:
-                        self._finish_cancelled()
-                        return
-                    for f in files:
-                        self._ui(self._update_file_status, f, "done")
-                    done_count = len(files)
-
-                else:
-                    n = len(files)
-                    for idx, webp_file in enumerate(files):
-                        if self._cancel_requested:
-                            self._finish_cancelled()
-                            return
-                        self._ui(self._update_file_status, webp_file, "converting")
-                        name = Path(webp_file).name
-                        frames = []
-                        try:
-                            frames = self._extract_frames(
-                                webp_file, temp_dir, settings,
-                                progress=lambda p, i=idx: self._ui_progress(
-                                    (2 * i + p) / (2 * n),
-                                    f"Extracting {i + 1}/{n}"),
-                            )
-                            if self._cancel_requested:
-                                self._finish_cancelled()
-                                return
-                            if not frames:
-                                raise RuntimeError("no frames decoded")
-                            out = unique_output_path(
-                                output_folder, Path(webp_file).stem, fmt)
-                            self._encode(frames, out, settings,
-                                         progress=lambda p, i=idx: self._ui_progress(
-                                             (2 * i + 1 + p) / (2 * n),
-                                             f"Encoding {i + 1}/{n}"))
-                            if self._cancel_requested:
-                                self._finish_cancelled()
-                                return
-                            self._ui(self._update_file_status, webp_file, "done")
-                            done_count += 1
-                        except Exception as e:
-                            self._ui(self._update_file_status, webp_file, "error")
-                            failures.append((name, str(e)))
-                        finally:
-                            # free disk space before next file
-                            for frame_path, _ in frames:
-                                try:
-                                    os.remove(frame_path)
-                                except OSError:
-                                    pass
-
-                if failures:
-                    first = failures[0]
-                    self._ui(self.progress_text.configure,
-                             text=f"{done_count} done, {len(failures)} failed")
-                    self._ui(self._commit_status, "ERROR", RED)
-                    self._ui(self.show_toast,
-                             f"{first[0]}: {first[1][:160]}", "err", 6000)
-                    if done_count:
-                        self._ui(self.show_toast,
-                                 f"{done_count} file(s) converted, "
-                                 f"{len(failures)} failed", "warn", 6000)
-                else:
-                    self._ui(self.progress_bar.set, 1.0)
-                    self._ui(self.progress_text.configure,
-                             text="Done — files saved to output folder")
-                    self._ui(self._commit_status, "DONE", GREEN)
-                    self._ui(self.show_toast, "Conversion complete — click to open folder",
-                             "ok", 5000, self.open_output_folder)
-
-            except Exception as e:
-                msg = str(e)
-                self._ui(self.show_toast, f"Error: {msg[:200]}", "err", 6000)
-                self._ui(self.progress_text.configure, text=f"Error: {msg[:120]}")
+    def _run_conversion(self, settings: dict, journal: JobJournal | None = None):
+        files = settings["files"]
+        try:
+            if journal is not None:
+                result = self._engine.resume(journal)
+            else:
+                result = self._engine.run(settings)
+            if result["cancelled"]:
+                self._finish_cancelled()
+                return
+            done_count, failures = result["done"], result["failures"]
+            if result["report"]:
+                report_dir = os.path.dirname(result["report"])
+                self._ui(self.show_toast,
+                         f"Timing report saved: {os.path.basename(result['report'])}",
+                         "info", 6000, lambda: self._open_folder(report_dir))
+
+            if failures:
+                first = failures[0]
+                self._ui(self.progress_text.configure,
+                         text=f"{done_count} done, {len(failures)} failed")
                 self._ui(self._commit_status, "ERROR", RED)
-                for f in files:
-                    if self.file_status.get(f) == "converting":
-                        self._ui(self._update_file_status, f, "error")
+                self._ui(self.show_toast,
+                         f"{first[0]}: {first[1][:160]}", "err", 6000)
+                if done_count:
+                    self._ui(self.show_toast,
+                             f"{done_count} file(s) converted, "
+                             f"{len(failures)} failed", "warn", 6000)
+            else:
+                self._ui(self.progress_bar.set, 1.0)
+                self._ui(self.progress_text.configure,
+                         text="Done — files saved to output folder")
+                self._ui(self._commit_status, "DONE", GREEN)
+                self._ui(self.show_toast, "Conversion complete — click to open folder",
+                         "ok", 5000, self.open_output_folder)
 
-            finally:
-                self._converting = False
-                self._cancel_requested = False
-                self._ui(self._reset_convert_btn)
-                self._ui(self._set_controls_enabled, True)
+        except Exception as e:
+            msg = str(e)
+            self._ui(self.show_toast, f"Error: {msg[:200]}", "err", 6000)
+            self._ui(self.progress_text.configure, text=f"Error: {msg[:120]}")
+            self._ui(self._commit_status, "ERROR", RED)
+            for f in files:
+                if self.file_status.get(f) == "converting":
+                    self._ui(self._update_file_status, f, "error")
+
+        finally:
+            self._converting = False
+            self._ui(self._reset_convert_btn)
+            self._ui(self._set_controls_enabled, True)
+
+    def _on_engine_event(self, event: dict):
+        kind = event["event"]
+        if kind == "status":
+            self._update_file_status(event["file"], event["status"])
+        elif kind == "progress":
+            self._ui_progress(event["fraction"], event["stage"])
 
     def _finish_cancelled(self):
         self._ui(self.progress_text.configure, text="Cancelled")
@@ -1415,159 +1780,10 @@ class WebPConverterApp(_AppBase):
             text_color="#000000",
         )
 
-    # ── Frame extraction ─────────────────────
-
-    def _extract_frames(self, webp_file: str, temp_dir: Path, settings: dict,
-                        start_idx: int = 0, target_override: tuple | None = None,
-                        progress=None) -> list[tuple[str, int]]:
-        """Stream frames to PNG files. Returns [(path, duration_ms), ...].
-        Raises on decode failure."""
-        frames: list[tuple[str, int]] = []
-        with Image.open(webp_file) as im:
-            target = target_override or self._target_size(im.width, im.height,
-                                                          settings)
-            n_frames = getattr(im, "n_frames", None)
-            for i, frame in enumerate(ImageSequence.Iterator(im)):
-                if self._cancel_requested:
-                    break
-                img = frame.convert("RGBA")
-                # info["duration"] is only populated once the frame is loaded
-                duration = int(frame.info.get("duration", 0) or 0)
-                if target_override:
-                    img = letterbox(img, target)
-                elif img.size != target:
-                    img = img.resize(target, Image.LANCZOS)
-                path = temp_dir / f"frame_{start_idx + i:06d}.png"
-                img.save(path)
-                frames.append((str(path), duration))
-                if progress and n_frames:
-                    progress(min(1.0, (i + 1) / n_frames))
-        return frames
-
-    # ── Encoding ─────────────────────────────
-
-    def _frame_durations_sec(self, frames: list[tuple[str, int]],
-                             settings: dict) -> list[float]:
-        fallback = 1.0 / settings["fps"]
-        if settings["source_timing"]:
-            return [(ms / 1000.0) if ms > 0 else fallback for _, ms in frames]
-        return [fallback] * len(frames)
-
-    def _encode(self, frames: list[tuple[str, int]], output_path: str,
-                settings: dict, progress=None):
-        try:
-            if settings["format"] == ".gif":
-                self._encode_gif(frames, output_path, settings, progress)
-            else:
-                self._encode_ffmpeg(frames, output_path, settings, progress)
-        except Exception:
-            self._remove_partial(output_path)
-            raise
-        if self._cancel_requested:
-            self._remove_partial(output_path)
-
-    @staticmethod
-    def _remove_partial(path: str):
-        try:
-            if os.path.exists(path):
-                os.remove(path)
-        except OSError:
-            pass
-
-    def _encode_gif(self, frames, output_path, settings, progress=None):
-        durations = self._frame_durations_sec(frames, settings)
-        images = []
-        try:
-            for i, (path, _) in enumerate(frames):
-                if self._cancel_requested:
-                    return
-                with Image.open(path) as img:
-                    images.append(rgba_to_gif_frame(img.convert("RGBA")))
-                if progress:
-                    progress(0.9 * (i + 1) / len(frames))
-            if not images:
-                raise RuntimeError("no frames to encode")
-            images[0].save(
-                output_path, save_all=True, append_images=images[1:],
-                duration=[max(20, int(d * 1000)) for d in durations],
-                loop=0, disposal=2, transparency=255, optimize=False,
-            )
-            if progress:
-                progress(1.0)
-        finally:
-            for img in images:
-                img.close()
-
-    def _encode_ffmpeg(self, frames, output_path, settings, progress=None):
-        ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
-        fmt = settings["format"]
-        crf = settings["crf"]
-        codec = {
-            ".mp4":  "libx264",
-            ".mkv":  "libx264",
-            ".webm": "libvpx-vp9",
-        }.get(fmt, "libx264")
-
-        durations = self._frame_durations_sec(frames, settings)
-        list_path = os.path.join(os.path.dirname(frames[0][0]), "_framelist.txt")
-        with open(list_path, "w", encoding="utf-8") as f:
-            last_entry = ""
-            for (frame_path, _), dur in zip(frames, durations):
-                escaped = frame_path.replace(os.sep, "/").replace("'", "'\\''")
-                last_entry = f"file '{escaped}'\n"
-                f.write(last_entry)
-                f.write(f"duration {dur:.6f}\n")
-            # concat demuxer quirk: repeat last file so its duration is honored
-            f.write(last_entry)
-
-        cmd = [ffmpeg_exe, "-y", "-f", "concat", "-safe", "0", "-i", list_path,
-               "-progress", "pipe:1", "-nostats", "-c:v", codec]
-        if codec == "libvpx-vp9":
-            cmd += ["-crf", str(crf), "-b:v", "0", "-row-mt", "1",
-                    "-deadline", "good", "-cpu-used", "2",
-                    "-pix_fmt", "yuv420p"]
-        else:
-            cmd += ["-crf", str(crf), "-pix_fmt", "yuv420p",
-                    "-preset", "medium"]
-            if fmt == ".mp4":
-                cmd += ["-movflags", "+faststart"]
-        cmd.append(output_path)
-
-        kwargs = {"stdout": subprocess.PIPE, "stderr": subprocess.PIPE}
-        if sys.platform == "win32":
-            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
-
-        proc = subprocess.Popen(cmd, **kwargs)
-        self._ffmpeg_proc = proc
-        stderr_chunks: list[bytes] = []
-        drain = threading.Thread(
-            target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
-        drain.start()
-        try:
-            total = len(frames)
-            for raw in proc.stdout:
-                line = raw.decode("utf-8", errors="ignore").strip()
-                if progress and total and line.startswith("frame="):
-                    try:
-                        progress(min(1.0, int(line.split("=", 1)[1]) / total))
-                    except ValueError:
-                        pass
-            proc.wait()
-        finally:
-            self._ffmpeg_proc = None
-        drain.join(timeout=2)
-
-        if proc.returncode != 0 and not self._cancel_requested:
-            err = (stderr_chunks[0] if stderr_chunks else b"")
-            raise RuntimeError(
-                f"ffmpeg failed: {err.decode(errors='ignore')[-400:]}")
-        if progress and not self._cancel_requested:
-            progress(1.0)
-
     # ── Toast notifications ──────────────────
 
     def show_toast(self, message: str, kind: str = "info",
-                   duration: int = 3200, on_click=None):
+                   duration: int = 3200, on_click=None, on_discard=None):
         colors = {
             "info": (CARD2, TEXT),
             "ok":   (GREEN, "#ffffff"),
@@ -1584,6 +1800,13 @@ class WebPConverterApp(_AppBase):
         def dismiss(_e=None):
             self._dismiss_toast(toast)
 
+        if on_discard:
+            label.pack_configure(pady=(10, 0))
+            discard = ctk.CTkLabel(toast, text="Discard", font=FONT_SMALL,
+                                   text_color=fg, cursor="hand2")
+            discard.pack(anchor="e", padx=18, pady=(0, 8))
+            discard.bind("<Button-1>", lambda _e: (on_discard(), dismiss()))
+
         for w in (toast, label):
             w.configure(cursor="hand2")
             if on_click:
@@ -1622,13 +1845,7 @@ class WebPConverterApp(_AppBase):
                     "Conversion running",
                     "A conversion is still running.\nCancel it and quit?"):
                 return
-            self._cancel_requested = True
-            proc = self._ffmpeg_proc
-            if proc:
-                try:
-                    proc.terminate()
-                except OSError:
-                    pass
+            self._engine.cancel()
         self._closing = True
         self._stop_preview()
         try:
@@ -1639,8 +1856,9 @@ class WebPConverterApp(_AppBase):
 
 
 def main():
+    multiprocessing.freeze_support()
     try:
-        app = WebPConverterApp()
+        app = WebPConverterApp(startup_profile="--startup-profile" in sys.argv[1:])
         app.mainloop()
     except Exception:
         import traceback